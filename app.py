@@ -1,8 +1,12 @@
 # app.py — Streamlit UI for materials_papers_harvester.py + CSV preview + bulk PDF download (ZIP to user)
 import streamlit as st
-import subprocess, sys, time, io, zipfile, shutil
+import collections, csv, io, os, queue, re, subprocess, sys, tempfile, threading, time, traceback, uuid, zipfile, shutil
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
-import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pacsv
+
+import materials_papers_harvester as harvester
 
 st.set_page_config(page_title="Materials Harvester", layout="wide")
 st.title("🔬 Materials Science Paper Harvester")
@@ -12,9 +16,12 @@ st.caption("Run the harvester, preview CSV, and (after a successful run) downloa
 ROOT = Path(__file__).parent.resolve()
 WORKDIR = ROOT / "runs" / "materials_harvest"
 WORKDIR.mkdir(parents=True, exist_ok=True)
+ROOT_STR, WORKDIR_STR = str(ROOT), str(WORKDIR)
 
-SCRIPT_PATH = ROOT / "materials_papers_harvester.py"
 DOWNLOADER_SCRIPT = ROOT / "download_verified_pdfs.py"   # external downloader
+ZIP_SPOOL_MAX = 64 << 20                                 # ZIP stays in RAM up to 64 MiB, then spills to disk
+ZIP_COPY_BUFFER = 1 << 20                                # 1 MiB reads when copying PDFs into the ZIP
+LOG_TAIL_LINES = 800                                     # log lines kept for the live log pane
 
 # ---- Session flags -----------------------------------------------------------
 if "cancel" not in st.session_state:
@@ -51,22 +58,224 @@ with st.sidebar:
     write_csv = st.checkbox("Also write CSV", value=True)
 
 # ---- Utilities ---------------------------------------------------------------
-def list_files(root: Path):
-    return {str(p) for p in root.rglob("*") if p.is_file()}
+def iter_files(root: Path):
+    """Yield os.DirEntry for every file under root (scandir walk, skips hidden dirs)."""
+    stack = [str(root)]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith("."):
+                            stack.append(entry.path)
+                    elif entry.is_file():
+                        yield entry
+        except OSError:
+            continue
 
 def newest_csv(root: Path):
-    cs = list(Path(root).rglob("*.csv"))
-    return max(cs, key=lambda p: p.stat().st_mtime) if cs else None
-
-def zip_dir_in_memory(base_dir: Path) -> io.BytesIO:
-    """Zip a directory (only PDFs) into a BytesIO for download_button."""
-    mem = io.BytesIO()
-    with zipfile.ZipFile(mem, mode="w", compression=zipfile.ZIP_DEFLATED) as zf:
+    best_path, best_mtime = None, -1.0
+    for entry in iter_files(root):
+        if entry.name.endswith(".csv"):
+            mtime = entry.stat().st_mtime
+            if mtime > best_mtime:
+                best_path, best_mtime = entry.path, mtime
+    return Path(best_path) if best_path else None
+
+# Abstracts may contain newlines inside quoted fields
+CSV_PARSE_OPTIONS = pacsv.ParseOptions(newlines_in_values=True)
+
+PREVIEW_ROWS = 200  # rows sent to the browser; the download button still has everything
+
+@st.cache_data(persist="disk", show_spinner=False)
+def _load_csv(path: str, mtime: float, limit: int = PREVIEW_ROWS) -> tuple:
+    """First `limit` rows of a result CSV and its total row count.
+
+    Streams record batches with pyarrow so the whole file is never held as one
+    table. Columns are read as strings: the streaming reader infers types from
+    the first block only, and a column that is empty there would break later.
+    `mtime` is only part of the cache key.
+    """
+    with open(path, newline="", encoding="utf-8") as f:
+        header = next(csv.reader(f), [])
+    if not header:
+        return pa.table({}), 0
+    reader = pacsv.open_csv(
+        path,
+        parse_options=CSV_PARSE_OPTIONS,
+        convert_options=pacsv.ConvertOptions(column_types={name: pa.string() for name in header}),
+    )
+    head, kept, total = [], 0, 0
+    for batch in reader:
+        total += batch.num_rows
+        if kept < limit:
+            head.append(batch.slice(0, limit - kept))
+            kept += head[-1].num_rows
+    return pa.Table.from_batches(head, schema=reader.schema), total
+
+@st.cache_data(show_spinner=False)
+def _csv_bytes(path: str, mtime: float) -> bytes:
+    """Raw bytes of the CSV the harvester wrote; no pandas re-serialization."""
+    return Path(path).read_bytes()
+
+@st.cache_resource
+def get_executor() -> ThreadPoolExecutor:
+    """Worker pool shared by all sessions and reruns (harvests, PDF downloads)."""
+    return ThreadPoolExecutor(max_workers=4, thread_name_prefix="harv")
+
+@st.cache_resource
+def _harvest_lock() -> threading.Lock:
+    """Server-wide: the harvester's memos and logger are module-level, so one harvest at a time."""
+    return threading.Lock()
+
+class HarvestBusy(RuntimeError):
+    """Another session's harvest is still running on this server."""
+
+class LineQueueWriter(io.TextIOBase):
+    """Text sink that forwards each complete line (with its newline) to a queue.
+
+    Partial lines are buffered per thread: print() writes text and "\n" separately,
+    and the harvester queries sources from several threads at once.
+    """
+
+    def __init__(self, q: queue.Queue):
+        self.q = q
+        self._partial = {}  # thread id -> unfinished line
+
+    def write(self, s: str) -> int:
+        tid = threading.get_ident()
+        *done, rest = (self._partial.pop(tid, "") + s).split("\n")
+        if rest:
+            self._partial[tid] = rest
+        for line in done:
+            self.q.put(line + "\n")
+        return len(s)
+
+    def close(self) -> None:
+        for rest in list(self._partial.values()):
+            self.q.put(rest + "\n")
+        self._partial.clear()
+        super().close()
+
+# Harvester progress markers look like "[sources] 3/9" or "[landing] 40/120".
+PROGRESS_RE = re.compile(r"\[(\w+)\]\s+(\d+)/(\d+)")
+PROGRESS_WEIGHTS = {"sources": 60, "landing": 35}   # % of the bar per phase; the first 5 % is startup
+
+def harvest_progress(seen_per_phase: dict) -> int:
+    """Bar value (5–100) from the latest (done, total) reported for each phase."""
+    pct = 5.0
+    for phase, weight in PROGRESS_WEIGHTS.items():
+        done, total = seen_per_phase.get(phase, (0, 1))
+        pct += weight * (done / total if total else 1.0)
+    return min(100, int(pct))
+
+def run_harvest(argv: list, log_q: queue.Queue, cancel: threading.Event, lock: threading.Lock) -> int:
+    """Run the harvester in this thread with its log routed to `log_q`, then release `lock`.
+
+    Returns a process-style exit code and always ends the stream with "" (EOF).
+    """
+    sink = LineQueueWriter(log_q)
+    try:
+        harvester.main(argv, cancel=cancel, stream=sink)
+        return 0
+    except SystemExit as e:
+        return e.code if isinstance(e.code, int) else 1
+    except Exception:
+        traceback.print_exc(file=sink)
+        return 1
+    finally:
+        lock.release()
+        sink.close()
+        log_q.put("")
+
+def start_harvest(argv: list, log_q: queue.Queue, cancel: threading.Event) -> Future:
+    """Submit run_harvest, or raise HarvestBusy at once if another harvest holds the lock."""
+    lock = _harvest_lock()
+    if not lock.acquire(blocking=False):
+        raise HarvestBusy("Another harvest is already running on this server. Try again when it finishes.")
+    try:
+        return get_executor().submit(run_harvest, argv, log_q, cancel, lock)
+    except BaseException:
+        lock.release()
+        raise
+
+def _read_pdfs(base_dir: Path, q: queue.Queue, stop: threading.Event) -> None:
+    """Producer for zip_pdfs: per PDF, queue its ZipInfo then its data chunks.
+
+    Ends with None, or with the exception that stopped it.
+    """
+    try:
         for p in sorted(base_dir.rglob("*.pdf")):
-            if p.is_file():
-                zf.write(p, arcname=str(p.relative_to(base_dir)))
-    mem.seek(0)
-    return mem
+            if not p.is_file():
+                continue
+            if stop.is_set():
+                return
+            q.put(zipfile.ZipInfo.from_file(p, arcname=str(p.relative_to(base_dir))))
+            with open(p, "rb", buffering=0) as src:
+                while chunk := src.read(ZIP_COPY_BUFFER):
+                    if stop.is_set():
+                        return
+                    q.put(chunk)
+        q.put(None)
+    except Exception as e:
+        q.put(e)
+
+def zip_pdfs(base_dir: Path) -> tempfile.SpooledTemporaryFile:
+    """Zip a directory (only PDFs) into a spooled temp file, rewound for reading.
+
+    Small archives stay in memory; past ZIP_SPOOL_MAX the spool moves to disk, so
+    memory stays bounded however large the PDF set is. PDFs are already
+    compressed, so members are STORED instead of re-DEFLATEd. A reader thread
+    fetches the next chunks while the current ones are written; the small
+    bounded queue caps what is held in memory.
+    """
+    spool = tempfile.SpooledTemporaryFile(max_size=ZIP_SPOOL_MAX)
+    q: queue.Queue = queue.Queue(maxsize=4)
+    stop = threading.Event()
+    threading.Thread(target=_read_pdfs, args=(base_dir, q, stop), daemon=True).start()
+    try:
+        with zipfile.ZipFile(spool, mode="w", compression=zipfile.ZIP_STORED) as zf:
+            item = q.get()
+            while isinstance(item, zipfile.ZipInfo):
+                with zf.open(item, "w", force_zip64=True) as dst:
+                    while isinstance(item := q.get(), bytes):
+                        dst.write(item)
+            if isinstance(item, Exception):
+                raise item
+    finally:
+        # Unblock the reader if we bailed out early
+        stop.set()
+        while not q.empty():
+            q.get_nowait()
+    spool.seek(0)
+    return spool
+
+# Streamlit 1.52+ runs a callable `data` only when the user clicks the download button
+DEFERRED_DOWNLOADS = tuple(int(x) for x in st.__version__.split(".")[:2]) >= (1, 52)
+
+def zip_pdf_bytes(base_dir: Path) -> bytes:
+    """The finished archive as one bytes object.
+
+    st.download_button turns whatever `data` is (file objects and callable results
+    included) into bytes held by its media store, so the archive is fully in memory
+    once it is served; the spool only bounds memory while it is being built.
+    """
+    with zip_pdfs(base_dir) as spool:
+        return spool.read()
+
+def pdf_dir_state(base_dir: Path) -> tuple:
+    """(name, size, mtime) of every PDF under base_dir; changes whenever the ZIP would."""
+    state = []
+    for e in iter_files(base_dir):
+        if e.name.endswith(".pdf"):
+            info = e.stat()
+            state.append((e.path, info.st_size, info.st_mtime_ns))
+    return tuple(sorted(state))
+
+@st.cache_data(max_entries=1, show_spinner=False)
+def _cached_zip_bytes(base_dir: str, state: tuple) -> bytes:
+    """Pre-1.52 fallback: the archive is built once per directory state, not on every rerun."""
+    return zip_pdf_bytes(Path(base_dir))
 
 # ---- Run controls ------------------------------------------------------------
 st.subheader("Run harvester")
@@ -96,79 +305,96 @@ if run:
     # safety check
     if not (query or "").strip():
         st.error("Please enter a topic in the query box (it is required).")
-    elif not SCRIPT_PATH.exists():
-        st.error(f"Script not found: {SCRIPT_PATH}")
     else:
         # reset run flags at start
         st.session_state.harvest_done = False
         st.session_state.last_csv_path = ""
         st.session_state.cancel = False
 
-        before = list_files(WORKDIR)
         start = time.time()
 
         with st.status("Running harvester…", state="running", expanded=True) as status:
             jsonl_name = f"{out_base}.jsonl"
             csv_name = f"{out_base}.csv" if write_csv else None
 
-            cmd = [
-                sys.executable, str(SCRIPT_PATH),
+            argv = [
                 "--query", query,
                 "--from-year", str(year_min),
                 "--to-year", str(year_max),
                 "--max-per-source", str(max_per_source),
-                "--out", jsonl_name,
+                "--out", str(WORKDIR / jsonl_name),
             ]
             if csv_name:
-                cmd += ["--csv", csv_name]
+                argv += ["--csv", str(WORKDIR / csv_name)]
             if strict:
-                cmd.append("--strict")
+                argv.append("--strict")
             if no_validate:
-                cmd.append("--no-validate")
+                argv.append("--no-validate")
 
+            # Harvest in-process on a worker thread; its output arrives line by line
+            # on log_q, and reads time out every 0.5 s so the elapsed counter and
+            # Cancel stay live while the harvester is quiet.
+            log_q: queue.Queue = queue.Queue()
+            cancel_evt = threading.Event()
             try:
-                proc = subprocess.Popen(
-                    cmd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.STDOUT,
-                    text=True,
-                    cwd=str(WORKDIR)
-                )
+                fut = start_harvest(argv, log_q, cancel_evt)
+            except HarvestBusy as e:
+                status.update(label=str(e), state="error")
             except Exception as e:
-                status.update(label="Failed to launch process.", state="error")
+                status.update(label="Failed to start harvester.", state="error")
                 st.exception(e)
             else:
-                lines = []
-                pseudo = 5
-                last_tick = time.time()
-                while True:
-                    line = proc.stdout.readline()
-                    if line == "" and proc.poll() is not None:
-                        break
-                    if line:
-                        lines.append(line.rstrip("\n"))
-                        log_box.code("\n".join(lines[-800:]))
-                        pseudo = min(95, pseudo + 1)
-                        progress_bar.progress(pseudo)
-
-                    now = time.time()
-                    if now - last_tick >= 1:
-                        elapsed = int(now - start)
-                        elapsed_ph.info(f"⏱️ Elapsed: {elapsed}s  •  Working directory: `{WORKDIR}`")
-                        if line == "":
-                            pseudo = min(95, pseudo + 1)
-                            progress_bar.progress(pseudo)
-                        last_tick = now
-
-                    if st.session_state.cancel:
+                try:
+                    lines = collections.deque(maxlen=LOG_TAIL_LINES)  # bounded tail; older lines drop off
+                    seen_per_phase = {}
+                    shown_pct = 0
+                    last_tick = time.time()
+                    last_render = 0.0
+                    dirty = False
+                    while True:
                         try:
-                            proc.terminate()
-                        except Exception:
-                            pass
-                        status.update(label="Cancelled by user.", state="error", expanded=True)
-                        break
-
-                ret = proc.wait()
+                            line = log_q.get(timeout=0.5)
+                        except queue.Empty:
+                            line = None
+                        if line == "":
+                            break
+                        if line is not None:
+                            lines.append(line.rstrip("\n"))
+                            m = PROGRESS_RE.match(line)
+                            if m and m.group(1) in PROGRESS_WEIGHTS:
+                                seen_per_phase[m.group(1)] = (int(m.group(2)), int(m.group(3)))
+                            dirty = True
+
+                        now = time.time()
+                        # Redraw at most ~10x per second; verbose runs emit far more lines
+                        if dirty and now - last_render >= 0.1:
+                            log_box.code("\n".join(lines))
+                            pct = harvest_progress(seen_per_phase)
+                            if pct != shown_pct:
+                                progress_bar.progress(pct)
+                                shown_pct = pct
+                            last_render = now
+                            dirty = False
+
+                        if now - last_tick >= 1:
+                            elapsed = int(now - start)
+                            elapsed_ph.info(f"⏱️ Elapsed: {elapsed}s  •  Working directory: `{WORKDIR_STR}`")
+                            last_tick = now
+
+                        if st.session_state.cancel:
+                            cancel_evt.set()
+                            status.update(label="Cancelled by user.", state="error", expanded=True)
+                            break
+
+                    log_box.code("\n".join(lines))
+                    pct = harvest_progress(seen_per_phase)
+                    if pct != shown_pct:
+                        progress_bar.progress(pct)
+                    ret = None if st.session_state.cancel else fut.result()
+                finally:
+                    # Also reached when Streamlit stops this script run mid-harvest
+                    if not fut.done():
+                        cancel_evt.set()
                 if not st.session_state.cancel:
                     if ret == 0:
                         progress_bar.progress(100)
@@ -178,9 +404,8 @@ if run:
                         status.update(label=f"Exited with code {ret}", state="error", expanded=True)
                         st.error(f"❌ Exit code {ret} — check logs above.")
 
-        # Show new files
-        after = list_files(WORKDIR)
-        new_files = sorted(after - before)
+        # Show new files (anything written since the run started)
+        new_files = sorted(e.path for e in iter_files(WORKDIR) if e.stat().st_mtime >= start)
         st.subheader("New files created")
         if new_files:
             st.write("\n".join(new_files[:200]))
@@ -193,18 +418,20 @@ if run:
             st.subheader("Preview newest CSV")
             st.caption(str(csv_path))
             try:
-                df = pd.read_csv(csv_path)
-                if df.empty:
+                csv_mtime = csv_path.stat().st_mtime
+                table, n_rows = _load_csv(str(csv_path), csv_mtime)
+                if n_rows == 0:
                     st.warning("The newest CSV is empty.")
                 else:
                     # mark success for download section
                     st.session_state.harvest_done = True
                     st.session_state.last_csv_path = str(csv_path)
 
-                    st.dataframe(df, use_container_width=True, hide_index=True)
+                    st.caption(f"{n_rows:,} rows — showing the first {table.num_rows:,}")
+                    st.dataframe(table, use_container_width=True, hide_index=True)
                     st.download_button(
                         "⬇️ Download CSV",
-                        data=df.to_csv(index=False).encode(),
+                        data=_csv_bytes(str(csv_path), csv_mtime),
                         file_name=csv_path.name,
                         mime="text/csv"
                     )
@@ -237,10 +464,12 @@ if st.session_state.harvest_done and st.session_state.last_csv_path:
             # remove both PDFs and harvested results
             pdf_dir = ROOT / pdf_outdir
             harvest_dir = WORKDIR
-            if pdf_dir.exists():
-                shutil.rmtree(pdf_dir)
-            if harvest_dir.exists():
-                shutil.rmtree(harvest_dir)
+            # Rename aside (instant, same filesystem) and unlink the trees in the background
+            for d in (pdf_dir, harvest_dir):
+                if d.exists():
+                    trash = d.with_name(f".trash-{d.name}-{uuid.uuid4().hex[:8]}")
+                    d.rename(trash)
+                    get_executor().submit(shutil.rmtree, trash, ignore_errors=True)
             # recreate empty harvest dir so app still works
             harvest_dir.mkdir(parents=True, exist_ok=True)
             st.success("✅ Cleared all stored results (CSVs and PDFs) from the server.")
@@ -268,13 +497,18 @@ if st.session_state.harvest_done and st.session_state.last_csv_path:
 
             with st.status("Downloading PDFs…", expanded=True) as s:
                 try:
-                    proc_dl = subprocess.run(cmd_dl, text=True, capture_output=True, cwd=str(ROOT))
+                    proc_dl = subprocess.run(cmd_dl, text=True, capture_output=True, cwd=ROOT_STR)
                     st.code(proc_dl.stdout or "(no output)")
                     if proc_dl.returncode == 0:
                         s.update(label="Completed ✔️", state="complete")
                         # Count PDFs
-                        files = sorted([p for p in outdir_abs.rglob("*.pdf") if p.is_file()])
-                        st.success(f"Downloaded **{len(files)}** PDF(s) to temporary folder: `{outdir_abs}`")
+                        n_pdfs, shown = 0, []
+                        for entry in iter_files(outdir_abs):
+                            if entry.name.endswith(".pdf"):
+                                n_pdfs += 1
+                                if len(shown) < 200:
+                                    shown.append(entry.name)
+                        st.success(f"Downloaded **{n_pdfs}** PDF(s) to temporary folder: `{outdir_abs}`")
 
                         # Offer failures CSV (if any)
                         fail_log = ROOT / "failed_downloads.csv"
@@ -287,22 +521,28 @@ if st.session_state.harvest_done and st.session_state.last_csv_path:
                             )
 
                         # Offer ZIP to user
-                        if make_zip and files:
-                            zip_bytes = zip_dir_in_memory(outdir_abs)
+                        if make_zip and n_pdfs:
+                            if DEFERRED_DOWNLOADS:
+                                # Built only on click, without a rerun that would drop this button
+                                zip_kwargs = {"data": lambda: zip_pdf_bytes(outdir_abs), "on_click": "ignore"}
+                            else:
+                                zip_kwargs = {"data": _cached_zip_bytes(str(outdir_abs), pdf_dir_state(outdir_abs))}
                             st.download_button(
                                 "⬇️ Download all PDFs as ZIP",
-                                data=zip_bytes,
                                 file_name="materials_pdfs.zip",
-                                mime="application/zip"
+                                mime="application/zip",
+                                **zip_kwargs,
                             )
 
                             with st.expander("Show individual files"):
-                                for p in files[:200]:
-                                    st.write(f"- {p.name}")
+                                for name in shown:
+                                    st.write(f"- {name}")
 
                     else:
                         s.update(label="Failed", state="error")
-                        st.error(proc_dl.stderr or "Downloader returned non-zero exit code.")
+                        # Fatal errors are logged to stdout with the rest; tracebacks land on stderr
+                        tail = "\n".join(proc_dl.stdout.strip().splitlines()[-3:])
+                        st.error(proc_dl.stderr or tail or "Downloader returned non-zero exit code.")
                 except Exception as e:
                     s.update(label="Error", state="error")
                     st.exception(e)
@@ -316,6 +556,3 @@ st.caption(
     "Notes: On Streamlit Cloud, files are stored temporarily in the app sandbox. "
     "Use the ZIP button to save all PDFs to your local computer once harvesting is complete."
 )
-
-import streamlit as st
-st.write(st.secrets.get("api_key", "No key in st.secrets"))
@@ -11,14 +11,13 @@ What it does:
 - Verifies each file after download:
     * header contains %PDF near the start
     * trailer contains %%EOF near the end
-    * (optional) tries to open with pypdf if installed
+    * (optional, --deep-verify) the startxref offset points at an xref table or stream
 - On any failure (HTTP error, not a PDF, truncated, validation error), logs the row to failed_downloads.csv.
 
 Usage:
   pip install requests
-  # optional: pip install pypdf  (for an extra validation pass)
   python download_verified_pdfs.py --in sources.csv --outdir pdfs \
-    --cookies cookies_scidir.txt --skip-existing
+    --cookies cookies_scidir.txt --skip-existing --workers 16
 
 Notes:
 - This script DOES NOT try to "fix/repair/extract" a PDF link from HTML pages.
@@ -27,28 +26,44 @@ Notes:
 
 import argparse
 import csv
+import hashlib
+import json
+import logging
+import mmap
 import os
+import queue
 import re
+import socket
 import sys
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from html import unescape
+from logging.handlers import QueueHandler, QueueListener
 from urllib.parse import urlsplit, unquote
 
 import requests
 from http.cookiejar import MozillaCookieJar
-
-# ---- optional deep validation ----
-try:
-    from pypdf import PdfReader  # pip install pypdf
-    HAVE_PYPDF = True
-except Exception:
-    HAVE_PYPDF = False
+from urllib3.util.retry import Retry
+from urllib3.exceptions import HTTPError as Urllib3Error
 
 UA = ("Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
       "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0 Safari/537.36")
 
 CHUNK = 64 * 1024  # 64 KB per chunk
+COPY_BUFFER = 1 << 20  # 1 MB reads when copying the body to disk
+DEDUP_INDEX = ".pdf_hashes.json"  # content digest -> filename, kept in --outdir
+PER_HOST_LIMIT = 4  # concurrent downloads per publisher host
+HOST_FAIL_LIMIT = 3  # consecutive connection failures before a host is given up for the run
 PLACEHOLDERS = {"", "-", "n/a", "na", "null", "none", "nan"}
 
+# ---- filename patterns (compiled once) ----
+FN_BAD = re.compile(r"[^A-Za-z0-9\-._ ]+")
+FN_SPACE = re.compile(r"\s+")
+CD_STAR = re.compile(r"filename\*=(?:UTF-8'')?([^;]+)", re.I)
+CD_PLAIN = re.compile(r"filename=([^;]+)", re.I)
+XREF_STREAM = re.compile(rb"\d+\s+\d+\s+obj\b")  # PDF 1.5+ cross-reference stream object
+
 def present(v: str) -> bool:
     s = (v or "").strip()
     return s and s.lower() not in PLACEHOLDERS
@@ -56,8 +71,8 @@ def present(v: str) -> bool:
 def sanitize_filename(name: str, max_len: int = 150) -> str:
     name = unescape(name or "").strip()
     name = name.replace("\\", "_").replace("/", "_")
-    name = re.sub(r"[^A-Za-z0-9\\-\\._ ]+", "_", name)
-    name = re.sub(r"\\s+", "_", name).strip("_")
+    name = FN_BAD.sub("_", name)
+    name = FN_SPACE.sub("_", name).strip("_")
     if not name:
         name = "file"
     if len(name) > max_len:
@@ -66,44 +81,192 @@ def sanitize_filename(name: str, max_len: int = 150) -> str:
     return name
 
 def filename_from_cd(cd: str) -> str:
-    if not cd:
+    # Most publishers send a bare "inline"/"attachment" or a plain filename=; cheap
+    # substring tests skip the regexes that cannot match
+    if not cd or "=" not in cd:
         return ""
-    m = re.search(r'filename\*=(?:UTF-8\'\')?([^;]+)', cd, re.I)
+    m = CD_STAR.search(cd) if "*=" in cd else None
     if m:
         return sanitize_filename(unquote(m.group(1)).strip('"\' '))
-    m = re.search(r'filename=([^;]+)', cd, re.I)
+    m = CD_PLAIN.search(cd)
     if m:
         return sanitize_filename(unquote(m.group(1)).strip('"\' '))
     return ""
 
-def guess_filename(row: dict, final_url: str, resp: requests.Response) -> str:
+def url_key(url: str) -> str:
+    """Stable 16-hex id for a pdf_url; embedded in saved filenames."""
+    return hashlib.sha1(url.encode("utf-8")).hexdigest()[:16]
+
+URL_KEY_RE = re.compile(r"-([0-9a-f]{16})\.pdf$")
+
+def index_existing(outdir: str) -> dict:
+    """Map url_key -> path for PDFs already in outdir (one directory scan)."""
+    found = {}
+    try:
+        with os.scandir(outdir) as it:
+            for entry in it:
+                m = URL_KEY_RE.search(entry.name)
+                if m and entry.is_file():
+                    found[m.group(1)] = entry.path
+    except OSError:
+        pass
+    return found
+
+def guess_filename(row: dict, final_url: str, resp: requests.Response, key: str = "") -> str:
     base = filename_from_cd(resp.headers.get("Content-Disposition", ""))
     if not base:
         seg = os.path.basename(urlsplit(final_url).path)
         seg = sanitize_filename(unquote(seg))
         base = seg or sanitize_filename((row.get("title") or row.get("doi") or "file"))
-    if not base.lower().endswith(".pdf"):
-        base += ".pdf"
-    return base
+    if base.lower().endswith(".pdf"):
+        base = base[:-4]
+    return f"{base}-{key}.pdf" if key else base + ".pdf"
+
+def ensure_unique(outdir: str, filename: str, max_tries: int = 9999):
+    """Atomically create a new file, adding -1, -2, … on collisions.
 
-def ensure_unique(outdir: str, filename: str) -> str:
+    Returns (path, unbuffered binary file). O_EXCL makes the claim race-free
+    between workers; after max_tries a uuid suffix is used.
+    """
     base, ext = os.path.splitext(filename)
-    path = os.path.join(outdir, filename)
-    i = 1
-    while os.path.exists(path):
-        path = os.path.join(outdir, f"{base}-{i}{ext}")
-        i += 1
-    return path
-
-def make_session(cookies_path: str = None) -> requests.Session:
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0)
+    for i in range(max_tries + 1):
+        path = os.path.join(outdir, f"{base}-{i}{ext}" if i else filename)
+        try:
+            fd = os.open(path, flags, 0o644)
+        except FileExistsError:
+            continue
+        return path, os.fdopen(fd, "wb", buffering=0)
+    path = os.path.join(outdir, f"{base}-{uuid.uuid4().hex}{ext}")
+    return path, os.fdopen(os.open(path, flags, 0o644), "wb", buffering=0)
+
+log = logging.getLogger("download_verified_pdfs")
+
+def setup_logging() -> QueueListener:
+    """Workers enqueue records; one listener thread writes them to stdout (the app shows stdout)."""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(logging.Formatter("%(asctime)s %(message)s", "%H:%M:%S"))
+    q = queue.SimpleQueue()
+    log.addHandler(QueueHandler(q))
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    listener = QueueListener(q, handler)
+    listener.start()
+    return listener
+
+_host_sems = {}
+_host_sems_lock = threading.Lock()
+_bad_hosts = set()  # hosts given up on for this run; later rows fail fast (guarded by _host_sems_lock)
+_host_conn_failures = {}  # host -> consecutive connection errors (guarded by _host_sems_lock)
+
+def host_semaphore(url: str, limit: int = PER_HOST_LIMIT) -> threading.Semaphore:
+    """One semaphore per netloc, so many workers never pile onto a single publisher."""
+    host = urlsplit(url).netloc.lower()
+    with _host_sems_lock:
+        sem = _host_sems.get(host)
+        if sem is None:
+            sem = _host_sems[host] = threading.Semaphore(limit)
+        return sem
+
+def host_unreachable(exc: BaseException) -> bool:
+    """True for DNS failures and refused connections, which won't recover within a run.
+
+    Timeouts, TLS errors and pool resets return False: with per-host concurrency
+    those are routine and the next row for the same host usually goes through.
+    """
+    seen, stack = set(), [exc]
+    while stack:
+        e = stack.pop()
+        if not isinstance(e, BaseException) or id(e) in seen:  # ssl errors carry a str .reason
+            continue
+        seen.add(id(e))
+        if isinstance(e, (socket.gaierror, ConnectionRefusedError)):
+            return True
+        stack += [e.__cause__, e.__context__, getattr(e, "reason", None)]
+        stack += [a for a in getattr(e, "args", ()) if isinstance(a, BaseException)]
+    return False
+
+def note_connection(host: str, exc: BaseException = None) -> None:
+    """Track per-host connection outcomes; blacklist on unreachable or repeated failures."""
+    with _host_sems_lock:
+        if exc is None:
+            _host_conn_failures.pop(host, None)
+            return
+        n = _host_conn_failures[host] = _host_conn_failures.get(host, 0) + 1
+        if n >= HOST_FAIL_LIMIT or host_unreachable(exc):
+            _bad_hosts.add(host)
+
+class DedupIndex:
+    """blake2b digest -> first saved filename, persisted as JSON in the output folder.
+
+    Also maps the url_key of every URL whose body was a duplicate to the file it
+    matched, since such URLs never get a <name>-<url_key>.pdf of their own.
+    """
+
+    def __init__(self, outdir: str):
+        self.outdir = outdir
+        self.path = os.path.join(outdir, DEDUP_INDEX)
+        self.lock = threading.Lock()
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            data = {}
+        if "digests" in data:
+            self.seen, self.urls = data["digests"], data.get("urls", {})
+        else:  # older flat digest -> filename index
+            self.seen, self.urls = data, {}
+
+    def claim(self, digest: str, path: str) -> str:
+        """Record path for digest; returns the earlier copy instead if it still exists."""
+        name = os.path.basename(path)
+        with self.lock:
+            prev = self.seen.get(digest)
+            if prev and prev != name and os.path.exists(os.path.join(self.outdir, prev)):
+                return os.path.join(self.outdir, prev)
+            self.seen[digest] = name
+            return path
+
+    def note_url(self, key: str, path: str) -> None:
+        """Remember that the URL with url_key `key` is served by the existing file `path`."""
+        with self.lock:
+            self.urls[key] = os.path.basename(path)
+
+    def url_paths(self) -> dict:
+        """url_key -> path for recorded dedup hits whose file is still present."""
+        with self.lock:
+            urls = dict(self.urls)
+        paths = {k: os.path.join(self.outdir, name) for k, name in urls.items()}
+        return {k: p for k, p in paths.items() if os.path.exists(p)}
+
+    def save(self) -> None:
+        with self.lock:
+            data = {"digests": dict(self.seen), "urls": dict(self.urls)}
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp, self.path)
+
+def load_cookies(cookies_path: str) -> MozillaCookieJar:
+    cj = MozillaCookieJar()
+    cj.load(cookies_path, ignore_discard=True, ignore_expires=True)
+    return cj
+
+def make_session(cookies: MozillaCookieJar = None, pool_size: int = 50) -> requests.Session:
+    """Shared session; `cookies` is a jar loaded once by load_cookies(), not a path."""
     s = requests.Session()
-    adapter = requests.adapters.HTTPAdapter(max_retries=3, pool_connections=50, pool_maxsize=50)
+    # Keep-alive: sockets go back to the pool when a response is closed, so same-host
+    # downloads skip the TCP + TLS handshake. raise_on_status=False returns the last
+    # response after retries, so the http_status:<code> reason is still logged.
+    retry = Retry(total=3, backoff_factor=0.5, status_forcelist=[429, 500, 502, 503, 504],
+                  raise_on_status=False)
+    adapter = requests.adapters.HTTPAdapter(max_retries=retry, pool_connections=pool_size, pool_maxsize=pool_size)
     s.mount("http://", adapter); s.mount("https://", adapter)
-    s.headers.update({"User-Agent": UA, "Accept": "application/pdf,*/*;q=0.8", "Connection": "close"})
-    if cookies_path:
-        cj = MozillaCookieJar()
-        cj.load(cookies_path, ignore_discard=True, ignore_expires=True)
-        s.cookies = cj
+    # PDFs are already compressed; identity avoids gzip CPU on both ends and lets
+    # Content-Length describe the bytes that land on disk
+    s.headers.update({"User-Agent": UA, "Accept": "application/pdf,*/*;q=0.8", "Accept-Encoding": "identity"})
+    if cookies is not None:
+        s.cookies = cookies
     return s
 
 def first_kb_has_pdf_magic(b: bytes) -> bool:
@@ -116,112 +279,185 @@ def first_kb_has_pdf_magic(b: bytes) -> bool:
 def ends_with_eof(path: str) -> bool:
     try:
         with open(path, "rb") as f:
-            f.seek(0, os.SEEK_END)
-            size = f.tell()
+            size = os.fstat(f.fileno()).st_size
             if size < 10:
                 return False
-            tail = 4096 if size >= 4096 else size
-            f.seek(-tail, os.SEEK_END)
-            end_bytes = f.read()
-        return (b"%%EOF" in end_bytes)
-    except Exception:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return mm.rfind(b"%%EOF", max(0, size - 4096)) != -1
+    except (OSError, ValueError):
+        return False
+
+def verify_xref_pointer(mm: mmap.mmap) -> bool:
+    """True if the last startxref offset lands on an xref table or xref stream object."""
+    size = len(mm)
+    idx = mm.rfind(b"startxref", max(0, size - 4096))
+    if idx == -1:
+        return False
+    end = mm.find(b"%%EOF", idx)
+    try:
+        off = int(mm[idx + 9: end if end != -1 else size].strip())
+    except ValueError:
+        return False
+    if not 0 <= off < size:
         return False
+    head = mm[off: off + 64].lstrip()
+    return head.startswith(b"xref") or XREF_STREAM.match(head) is not None
 
-def verify_pdf_file(path: str, deep: bool = True) -> (bool, str):
-    # quick checks
+def verify_pdf_mmap(path: str, deep: bool = False) -> (bool, str):
+    """Header, trailer and size checks over a single read-only mapping.
+
+    deep adds the startxref pointer check: a few KB read, no object parsing.
+    """
     try:
         with open(path, "rb") as f:
-            first = f.read(4096)
-    except Exception as e:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return False, "empty_file"
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                if mm.find(b"%PDF", 0, 1024) == -1:
+                    return False, "no_pdf_header"
+                if size < 10 or mm.rfind(b"%%EOF", max(0, size - 4096)) == -1:
+                    return False, "missing_eof"
+                if deep and not verify_xref_pointer(mm):
+                    return False, "bad_xref_pointer"
+    except (OSError, ValueError) as e:
         return False, f"read_error:{e.__class__.__name__}"
+    return True, "ok"
 
-    if not first_kb_has_pdf_magic(first):
-        return False, "no_pdf_header"
-
-    if not ends_with_eof(path):
-        return False, "missing_eof"
-
-    if deep and HAVE_PYPDF:
-        try:
-            PdfReader(path)  # parse xref, etc.
-        except Exception as e:
-            return False, f"pypdf_parse_error:{e.__class__.__name__}"
+def verify_pdf_file(path: str, deep: bool = False) -> (bool, str):
+    return verify_pdf_mmap(path, deep=deep)
 
-    return True, "ok"
+def content_length(resp: requests.Response) -> int:
+    """Declared body size on disk, or 0 if unknown (or compressed, so the decoded size differs)."""
+    if resp.headers.get("Content-Encoding", "identity").lower() not in ("", "identity"):
+        return 0
+    try:
+        return max(0, int(resp.headers.get("Content-Length") or 0))
+    except ValueError:
+        return 0
 
 def download_one(session: requests.Session, row: dict, outdir: str,
                  connect_timeout: float, read_timeout: float,
-                 skip_existing: bool) -> (bool, str, str):
+                 skip_existing: bool, deep_verify: bool = False,
+                 existing: dict = None, dedup: DedupIndex = None) -> (bool, str, str):
     """
     Returns (ok, path_or_url, reason)
     ok=True: path_or_url is local file path
     ok=False: path_or_url is the original pdf_url
+    existing: url_key -> path from index_existing(); with skip_existing, a valid
+    file for this URL short-circuits before any network request.
+    dedup: content index; a body identical to an earlier download is dropped and
+    (True, earlier_path, "dedup") is returned.
     """
     url = (row.get("pdf_url") or "").strip()
     if not present(url):
         return False, url, "empty_pdf_url"
+    parts = urlsplit(url)
+    if parts.scheme.lower() not in ("http", "https") or not parts.netloc:
+        return False, url, "bad_url_scheme"
+
+    key = url_key(url)
+    if skip_existing and existing and key in existing:
+        if verify_pdf_file(existing[key], deep=deep_verify)[0]:
+            return True, existing[key], "exists_ok"
 
     referer = (row.get("page_url") or "").strip() or None
     headers = {"Referer": referer} if referer else {}
 
+    host = parts.netloc.lower()
+    with _host_sems_lock:
+        given_up = host in _bad_hosts
+    if given_up:
+        return False, url, "host_unreachable"
+
     # GET (stream) with moderate timeouts; if the server is very slow this can still take a while
     try:
         r = session.get(url, timeout=(connect_timeout, read_timeout), allow_redirects=True, stream=True, headers=headers)
-    except requests.RequestException as e:
+    except requests.ConnectionError as e:
+        note_connection(host, e)
         return False, url, f"http_error:{e.__class__.__name__}"
-
-    if not (200 <= r.status_code < 400):
-        return False, url, f"http_status:{r.status_code}"
-
-    # Peek first chunk
-    first = b""
-    try:
-        for chunk in r.iter_content(CHUNK):
-            if chunk:
-                first = chunk
-                break
     except requests.RequestException as e:
-        return False, url, f"stream_error:{e.__class__.__name__}"
-
-    # Basic content-type / magic header check BEFORE writing a file
-    ctype = (r.headers.get("Content-Type") or "").lower()
-    looks_pdfish = ("application/pdf" in ctype) or first_kb_has_pdf_magic(first)
-    if not looks_pdfish:
-        r.close()
-        return False, url, "not_pdf_response"
-
-    # Decide filename and path
-    final_url = r.url or url
-    fname = guess_filename(row, final_url, r)
-    path = os.path.join(outdir, fname)
-    if skip_existing and os.path.exists(path):
-        # Still verify the existing file; if it fails, we will write a new unique filename
-        ok_existing, why = verify_pdf_file(path, deep=True)
-        if ok_existing:
-            return True, path, "exists_ok"
-        else:
-            path = ensure_unique(outdir, fname)  # write a fresh copy
-
-    # Write file (include the first chunk we already read)
-    try:
-        with open(path, "wb") as f:
-            if first:
-                f.write(first)
-            for chunk in r.iter_content(CHUNK):
-                if chunk:
-                    f.write(chunk)
-    except Exception as e:
-        r.close()
+        return False, url, f"http_error:{e.__class__.__name__}"
+    note_connection(host)
+
+    with r:  # always hands the connection back to the pool, even on early returns
+        if not (200 <= r.status_code < 400):
+            return False, url, f"http_status:{r.status_code}"
+
+        # Peek first chunk. Read straight from the urllib3 response when we can, so the body
+        # copy below skips the iter_content generator. We ask for identity encoding, but
+        # decoding stays on for servers that compress anyway.
+        raw = getattr(r, "raw", None)
+        use_raw = callable(getattr(raw, "read", None))
+        first = b""
         try:
-            if os.path.exists(path): os.remove(path)
-        except OSError:
-            pass
-        return False, url, f"write_error:{e.__class__.__name__}"
-
-    r.close()
+            if use_raw:
+                raw.decode_content = True
+                first = raw.read(CHUNK) or b""
+            else:
+                for chunk in r.iter_content(CHUNK):
+                    if chunk:
+                        first = chunk
+                        break
+        except (requests.RequestException, Urllib3Error, OSError) as e:
+            return False, url, f"stream_error:{e.__class__.__name__}"
+
+        # Basic content-type / magic header check BEFORE writing a file
+        ctype = (r.headers.get("Content-Type") or "").lower()
+        looks_pdfish = ("application/pdf" in ctype) or first_kb_has_pdf_magic(first)
+        if not looks_pdfish:
+            return False, url, "not_pdf_response"
+
+        # Decide filename and path
+        final_url = r.url or url
+        fname = guess_filename(row, final_url, r, key)
+        path = os.path.join(outdir, fname)
+        if skip_existing and os.path.exists(path):
+            # Still verify the existing file; if it fails, we will write a new unique filename
+            ok_existing, why = verify_pdf_file(path, deep=deep_verify)
+            if ok_existing:
+                return True, path, "exists_ok"
+
+        # Write file (include the first chunk we already read). Files are never
+        # overwritten: a taken name gets a -N suffix, claimed atomically.
+        # The body is hashed as it streams, for cross-URL dedup.
+        path = None
+        h = hashlib.blake2b(digest_size=16)
+        try:
+            path, f = ensure_unique(outdir, fname)
+            with f:  # unbuffered; the copy buffer is already large
+                # Reserve the whole file up front when the size is known: fewer extents,
+                # and a full disk fails here instead of mid-download
+                size = content_length(r)
+                if size and hasattr(os, "posix_fallocate"):
+                    os.posix_fallocate(f.fileno(), 0, size)
+                written = 0
+                if use_raw:
+                    # Top the peeked chunk up to a full buffer so the head goes out in one write
+                    chunk = first + (raw.read(COPY_BUFFER - len(first)) or b"")
+                    while chunk:
+                        h.update(chunk)
+                        written += f.write(chunk)
+                        chunk = raw.read(COPY_BUFFER)
+                else:
+                    if first:
+                        h.update(first)
+                        written += f.write(first)
+                    for chunk in r.iter_content(COPY_BUFFER):
+                        if chunk:
+                            h.update(chunk)
+                            written += f.write(chunk)
+                if size and written != size:
+                    os.ftruncate(f.fileno(), written)  # server over-reported; drop the reserved tail
+        except Exception as e:
+            try:
+                if path: os.remove(path)
+            except OSError:
+                pass
+            return False, url, f"write_error:{e.__class__.__name__}"
 
     # Verify the saved file
-    ok_file, reason = verify_pdf_file(path, deep=True)
+    ok_file, reason = verify_pdf_file(path, deep=deep_verify)
     if not ok_file:
         try:
             os.remove(path)
@@ -229,95 +465,169 @@ def download_one(session: requests.Session, row: dict, outdir: str,
             pass
         return False, url, f"verify_fail:{reason}"
 
+    if dedup is not None:
+        earlier = dedup.claim(h.hexdigest(), path)
+        if earlier != path:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            dedup.note_url(key, earlier)  # lets --skip-existing recognise this URL next time
+            return True, earlier, "dedup"
+
     return True, path, "ok"
 
 def main():
+    listener = setup_logging()
+    try:
+        run()
+    finally:
+        listener.stop()  # flushes queued records
+
+def run():
     ap = argparse.ArgumentParser()
     ap.add_argument("--in", dest="in_csv", required=True, help="Input CSV path")
     ap.add_argument("--outdir", default="pdfs", help="Output folder (default: pdfs)")
     ap.add_argument("--cookies", help="Path to Netscape cookies.txt (optional)")
     ap.add_argument("--connect-timeout", type=float, default=8.0, help="TCP connect timeout (s)")
     ap.add_argument("--read-timeout", type=float, default=20.0, help="Per-socket read timeout (s)")
-    ap.add_argument("--skip-existing", action="store_true", help="Do not re-download if a same-named, valid PDF already exists")
+    ap.add_argument("--skip-existing", action="store_true", help="Do not re-download URLs whose valid PDF is already in --outdir")
     ap.add_argument("--fail-log", default="failed_downloads.csv", help="CSV file to write failures (default: failed_downloads.csv)")
+    ap.add_argument("--deep-verify", action="store_true", help="Also check that startxref points at a real xref table/stream")
+    ap.add_argument("--quiet", action="store_true", help="Only log the start and the end-of-run summary")
+    ap.add_argument("--workers", type=int, default=8, help="Parallel downloads (default: 8)")
+    ap.add_argument("--per-host", type=int, default=PER_HOST_LIMIT,
+                    help=f"Max parallel downloads per host (default: {PER_HOST_LIMIT})")
     args = ap.parse_args()
+    workers = max(1, args.workers)
+    per_host = max(1, args.per_host)
 
     os.makedirs(args.outdir, exist_ok=True)
 
-    # Build HTTP session
-    session = make_session(args.cookies)
-
-    # Load rows
-    with open(args.in_csv, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        fieldnames = reader.fieldnames or []
-        if "pdf_url" not in fieldnames:
-            print("Error: CSV must contain 'pdf_url' column.", file=sys.stderr)
-            sys.exit(1)
-        have_title = "title" in fieldnames
-        have_page = "page_url" in fieldnames
-        rows = list(reader)
-
-    # Prepare failure log
+    # Build HTTP session (shared by all workers; size the pool to match)
+    cookies = load_cookies(args.cookies) if args.cookies else None
+    session = make_session(cookies, pool_size=max(50, workers))
+    dedup = DedupIndex(args.outdir)
+    existing = {}
+    if args.skip_existing:
+        existing = dedup.url_paths()
+        existing.update(index_existing(args.outdir))
+
+    # Failure log: opened on the first failure, one line-buffered row per failure,
+    # so an interrupted run still leaves everything that failed so far on disk
     fail_fields = ["title", "pdf_url", "page_url", "reason"]
-    failed_rows = []
+    fail_log = {}  # "fp", "writer" once opened
+    lock = threading.Lock()
+    stop = threading.Event()
 
     total = 0
     ok = 0
     failed = 0
 
-    print(f"Starting downloads… total rows: {len(rows)}\n", flush=True)
-
-    for i, row in enumerate(rows, 1):
-        pdf_url = (row.get("pdf_url") or "").strip()
-        if not present(pdf_url):
-            # Consider empty pdf_url a failure so you can handle it manually.
-            failed += 1
-            failed_rows.append({
+    def fail(row: dict, pdf_url: str, reason: str) -> None:
+        with lock:
+            if not fail_log:
+                fp = open(args.fail_log, "w", newline="", encoding="utf-8", buffering=1)
+                fail_log["fp"], fail_log["writer"] = fp, csv.DictWriter(fp, fieldnames=fail_fields)
+                fail_log["writer"].writeheader()
+            fail_log["writer"].writerow({
                 "title": row.get("title",""),
                 "pdf_url": pdf_url,
                 "page_url": row.get("page_url",""),
-                "reason": "empty_pdf_url",
+                "reason": reason,
             })
-            print(f"[{ok}/{failed} | {i}/{len(rows)}] × Empty pdf_url", flush=True)
-            continue
-
-        total += 1
-        title_disp = (row.get("title") or "(no title)")[:80]
-        print(f"[{i}/{len(rows)}] {title_disp}", flush=True)
-        print(f"  → {pdf_url}", flush=True)
 
-        success, path_or_url, reason = download_one(
-            session, row, args.outdir,
-            connect_timeout=args.connect_timeout,
-            read_timeout=args.read_timeout,
-            skip_existing=args.skip_existing
-        )
+    def worker(row: dict, pdf_url: str) -> (bool, str, str):
+        if stop.is_set():
+            return False, pdf_url, "cancelled"
+        with host_semaphore(pdf_url, per_host):
+            if stop.is_set():
+                return False, pdf_url, "cancelled"
+            return download_one(
+                session, row, args.outdir,
+                connect_timeout=args.connect_timeout,
+                read_timeout=args.read_timeout,
+                skip_existing=args.skip_existing,
+                deep_verify=args.deep_verify,
+                existing=existing,
+                dedup=dedup,
+            )
+
+    def report(fut) -> None:
+        """Print and tally one finished download (main thread only, so lines stay together)."""
+        nonlocal ok, failed, done
+        row, pdf_url = futures.pop(fut)
+        try:
+            success, path_or_url, reason = fut.result()
+        except Exception as e:
+            success, path_or_url, reason = False, pdf_url, f"error:{e.__class__.__name__}"
 
+        done += 1
         if success:
             ok += 1
-            print(f"  ✓ Saved: {os.path.basename(path_or_url)}\n", flush=True)
+            if reason == "dedup":
+                outcome = f"  = Duplicate of: {os.path.basename(path_or_url)}"
+            else:
+                outcome = f"  ✓ Saved: {os.path.basename(path_or_url)}"
         else:
             failed += 1
-            failed_rows.append({
-                "title": row.get("title",""),
-                "pdf_url": pdf_url,
-                "page_url": row.get("page_url",""),
-                "reason": reason,
-            })
-            print(f"  × Failed: {reason}\n", flush=True)
-
-    # Write failure log
-    if failed_rows:
-        with open(args.fail_log, "w", newline="", encoding="utf-8") as f:
-            w = csv.DictWriter(f, fieldnames=fail_fields)
-            w.writeheader()
-            w.writerows(failed_rows)
-
-    print("Done.")
-    print(f"Summary: Tried: {total} | Downloaded OK: {ok} | Failed: {failed}")
-    if failed_rows:
-        print(f"Failures saved to: {args.fail_log}")
+            fail(row, pdf_url, reason)
+            outcome = f"  × Failed: {reason}"
+        if not args.quiet:
+            title_disp = (row.get("title") or "(no title)")[:80]
+            log.info("[%d/%d] %s\n  → %s\n%s", done, total, title_disp, pdf_url, outcome)
+
+    log.info("Starting downloads…  (workers: %d, per host: %d)", workers, per_host)
+
+    # Rows are streamed from the CSV straight into the pool. At most workers*2 are in
+    # flight, so memory stays flat and downloads start before the file is fully read.
+    ex = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dl")
+    futures = {}
+    finished = queue.Queue()
+    max_pending = workers * 2
+    done = 0
+    try:
+        with open(args.in_csv, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            fieldnames = reader.fieldnames or []
+            if "pdf_url" not in fieldnames:
+                log.error("Error: CSV must contain 'pdf_url' column.")
+                sys.exit(1)
+
+            for i, row in enumerate(reader, 1):
+                pdf_url = (row.get("pdf_url") or "").strip()
+                if not present(pdf_url):
+                    # Consider empty pdf_url a failure so you can handle it manually.
+                    failed += 1
+                    fail(row, pdf_url, "empty_pdf_url")
+                    if not args.quiet:
+                        log.info("[%d/%d | row %d] × Empty pdf_url", ok, failed, i)
+                    continue
+                while len(futures) >= max_pending:
+                    report(finished.get())
+                total += 1
+                fut = ex.submit(worker, row, pdf_url)
+                futures[fut] = (row, pdf_url)
+                fut.add_done_callback(finished.put)
+
+        while futures:
+            report(finished.get())
+    except KeyboardInterrupt:
+        stop.set()
+        log.warning("Interrupted; waiting for in-flight downloads to stop…")
+    finally:
+        ex.shutdown(wait=True, cancel_futures=True)
+        try:
+            dedup.save()
+        except OSError as e:
+            log.error("Could not save %s: %s", DEDUP_INDEX, e)
+        if fail_log:
+            fail_log["fp"].close()
+
+    log.info("Done.")
+    log.info("Summary: Tried: %d | Downloaded OK: %d | Failed: %d", total, ok, failed)
+    if fail_log:
+        log.info("Failures saved to: %s", args.fail_log)
 
 if __name__ == "__main__":
     main()
@@ -24,18 +24,26 @@ from __future__ import annotations
 import argparse
 import csv
 import json
+import logging
+import math
 import os
 import random
 import re
 import sys
+import threading
 import time
+import xml.etree.ElementTree as ET
+from contextlib import nullcontext
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed, wait
 from dataclasses import dataclass, field
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from typing import Any, Dict, Iterable, List, Optional
 from urllib.parse import urljoin, urlparse, quote
 
 import requests
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 # Optional deps
 try:
@@ -45,10 +53,26 @@ except Exception:
     rf_process = None
 
 try:
-    from bs4 import BeautifulSoup
+    from bs4 import BeautifulSoup, SoupStrainer
 except Exception:
     BeautifulSoup = None  # scraping will fallback to regex if BS4 missing
 
+try:
+    import lxml  # noqa: F401  (only used as the BS4 tree builder)
+    BS_PARSER = "lxml"
+except Exception:
+    BS_PARSER = "html.parser"
+
+try:
+    from requests_cache import CachedSession
+except Exception:
+    CachedSession = None  # HARVEST_HTTP_CACHE is ignored without requests-cache
+
+try:
+    import orjson
+except Exception:
+    orjson = None  # stdlib json is used for decoding and JSONL export
+
 # --------------------------- Identity & headers ---------------------------
 
 # Static as requested
@@ -64,48 +88,108 @@ USER_AGENT = (
 HEADERS_JSON = {"User-Agent": USER_AGENT, "Accept": "application/json"}
 HEADERS_TEXT = {"User-Agent": USER_AGENT, "Accept": "*/*"}
 
-SESSION = requests.Session()
-SESSION.headers.update(
-    {
-        "User-Agent": USER_AGENT,
-        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-        "Accept-Language": "en;q=0.9",
-    }
+# Two pooled sessions so sockets and TLS sessions are reused across threads:
+# - SESSION (search APIs, Unpaywall): urllib3 retries connection errors, 429 and 5xx with
+#   backoff, honouring Retry-After; the last response is returned as-is and
+#   raise_for_status() in the helpers turns it into an error for the caller.
+# - SCRAPE_SESSION (doi.org, landing pages, PDF probes): one retry on a failed connect and
+#   no status retries or Retry-After sleeps. A publisher that answers scrapers with
+#   429/503 is skipped for that record instead of stalling its host slot in backoff.
+_ADAPTER = HTTPAdapter(
+    pool_connections=64,
+    pool_maxsize=64,
+    max_retries=Retry(
+        total=5,
+        backoff_factor=0.8,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "HEAD", "POST"],  # the only POST is a read-only E-utilities query
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    ),
 )
+_SCRAPE_ADAPTER = HTTPAdapter(
+    pool_connections=64,
+    pool_maxsize=64,
+    max_retries=Retry(total=1, read=False, respect_retry_after_header=False, raise_on_status=False),
+)
+_BROWSER_HEADERS = {
+    "User-Agent": USER_AGENT,
+    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+    "Accept-Language": "en;q=0.9",
+}
+
+SESSION = requests.Session()
+SESSION.mount("https://", _ADAPTER)
+SESSION.mount("http://", _ADAPTER)
+SESSION.headers.update(_BROWSER_HEADERS)
+
+SCRAPE_SESSION = requests.Session()
+SCRAPE_SESSION.mount("https://", _SCRAPE_ADAPTER)
+SCRAPE_SESSION.mount("http://", _SCRAPE_ADAPTER)
+SCRAPE_SESSION.headers.update(_BROWSER_HEADERS)
 TIMEOUT = 15
 
+# Optional on-disk cache for the enrichment calls that repeat across runs (Unpaywall,
+# doi.org redirects, landing pages). Opt-in: set HARVEST_HTTP_CACHE to a cache path,
+# e.g. runs/.http_cache. Search APIs always go through the plain SESSION.
+HTTP_CACHE = os.getenv("HARVEST_HTTP_CACHE")
+CACHED_SESSION = SESSION
+CACHED_SCRAPE_SESSION = SCRAPE_SESSION
+if HTTP_CACHE and CachedSession is not None:
+
+    def _cached_session(adapter: HTTPAdapter, backend: Any = None) -> requests.Session:
+        # Only 200s are stored, so a 5xx/429 body that outlived the retries is never replayed
+        sess = CachedSession(
+            HTTP_CACHE,
+            backend=backend or "sqlite",
+            expire_after=timedelta(days=30),
+            urls_expire_after={
+                "api.unpaywall.org": timedelta(days=30),
+                "api.crossref.org": timedelta(days=1),
+                "doi.org": timedelta(days=30),
+            },
+            allowable_codes=(200,),
+            allowable_methods=("GET", "HEAD"),
+            cache_control=True,
+            stale_if_error=True,
+        )
+        sess.mount("https://", adapter)
+        sess.mount("http://", adapter)
+        sess.headers.update(_BROWSER_HEADERS)
+        return sess
 
-# --------------------------- HTTP helpers ---------------------------
+    # Same split as the plain sessions, one sqlite store
+    CACHED_SESSION = _cached_session(_ADAPTER)
+    CACHED_SCRAPE_SESSION = _cached_session(_SCRAPE_ADAPTER, backend=CACHED_SESSION.cache)
 
-class HttpError(Exception):
-    pass
 
+# --------------------------- HTTP helpers ---------------------------
 
-@retry(
-    reraise=True,
-    stop=stop_after_attempt(5),
-    wait=wait_exponential(multiplier=0.8, min=1, max=10),
-    retry=retry_if_exception_type((requests.RequestException, HttpError)),
-)
 def _get_json(
-    url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    headers: Optional[Dict[str, str]] = None,
+    session: Optional[requests.Session] = None,
 ) -> Any:
     h = dict(HEADERS_JSON)
     if headers:
         h.update(headers)
-    r = SESSION.get(url, params=params, headers=h, timeout=TIMEOUT)
-    if r.status_code == 429:
-        raise HttpError("429 Too Many Requests")
+    r = (session or SESSION).get(url, params=params, headers=h, timeout=TIMEOUT)
     r.raise_for_status()
+    if orjson is not None:
+        return orjson.loads(r.content)
+    return r.json()
+
+
+def _post_json(url: str, data: Dict[str, Any]) -> Any:
+    """Form-encoded POST for endpoints whose parameters may not fit in a URL."""
+    r = SESSION.post(url, data=data, headers=HEADERS_JSON, timeout=TIMEOUT)
+    r.raise_for_status()
+    if orjson is not None:
+        return orjson.loads(r.content)
     return r.json()
 
 
-@retry(
-    reraise=True,
-    stop=stop_after_attempt(5),
-    wait=wait_exponential(multiplier=0.8, min=1, max=10),
-    retry=retry_if_exception_type((requests.RequestException, HttpError)),
-)
 def _get_text(
     url: str, params: Optional[Dict[str, Any]] = None, headers: Optional[Dict[str, str]] = None
 ) -> str:
@@ -113,8 +197,6 @@ def _get_text(
     if headers:
         h.update(headers)
     r = SESSION.get(url, params=params, headers=h, timeout=TIMEOUT)
-    if r.status_code == 429:
-        raise HttpError("429 Too Many Requests")
     r.raise_for_status()
     return r.text
 
@@ -136,24 +218,54 @@ MATERIALS_KEYWORDS = [
 MATERIALS_RE = re.compile("(" + "|".join(MATERIALS_KEYWORDS) + ")", re.I)
 EXCLUDE_RE = re.compile(r"\b(nursing|clinical|veterinary|pediat|oncolog|dermatolog|surgery)\b", re.I)
 
+# score_record lowercases its text once, so the keyword scans run case-sensitively
+# on lowercased patterns instead of paying for re.I on every character
+_MATERIALS_LC = re.compile(MATERIALS_RE.pattern.lower())
+_EXCLUDE_LC = re.compile(EXCLUDE_RE.pattern.lower())
+
+# Hot-path patterns, compiled once
+_TOKEN_RE = re.compile(r"[a-z0-9\-]{3,}")
+_YEAR_RE = re.compile(r"(19|20)\d{2}")
+_WS = re.compile(r"\s+")
+
+
+_NBSP_TABLE = str.maketrans({"\u00a0": " "})
+
 
 def norm(s: Optional[str]) -> str:
-    return (s or "").strip().replace("\u00a0", " ")
+    return (s or "").translate(_NBSP_TABLE).strip()
 
 
 def safe_year(s: Optional[str]) -> Optional[int]:
     if not s:
         return None
     try:
-        m = re.search(r"(19|20)\d{2}", s)
+        m = _YEAR_RE.search(s)
         return int(m.group(0)) if m else None
     except Exception:
         return None
 
 
+log = logging.getLogger("materials_papers_harvester")
+log.addHandler(logging.NullHandler())  # stragglers logging after a run ends are dropped, not sent to stderr
+
+
+def setup_logging(level: int = logging.INFO, stream=None) -> logging.Handler:
+    """Send log lines to `stream` (default sys.stdout); the app passes its per-run sink.
+
+    Returns the handler so the caller can detach it when the run ends.
+    """
+    handler = logging.StreamHandler(stream or sys.stdout)
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    log.addHandler(handler)
+    log.setLevel(level)
+    log.propagate = False
+    return handler
+
+
 # --------------------------- Data model ---------------------------
 
-@dataclass
+@dataclass(slots=True)  # no per-instance __dict__; records are held by the thousand
 class Record:
     title: str = ""
     abstract: str = ""
@@ -180,21 +292,46 @@ class Record:
             "_score": self.score,
         }
 
+    def csv_row(self) -> tuple:
+        """Values in CSV_FIELDS order; authors joined with '; '."""
+        return (
+            self.title,
+            self.abstract,
+            self.year,
+            self.doi,
+            self.url,
+            self.pdf_url,
+            self.venue,
+            "; ".join(self.authors),
+            self.source,
+            self.score,
+        )
+
+
+CSV_FIELDS = ("title", "abstract", "year", "doi", "url", "pdf_url", "venue", "authors", "source", "_score")
+
 
 # --------------------------- Scoring ---------------------------
 
-def score_record(rec: Record, query: str) -> float:
-    s = 0.0
+@lru_cache(maxsize=32)
+def _query_terms(query: str):
+    """(token set, word set) for a query; memoised so per-record score_record() calls reuse it."""
     q = query.lower()
-    hay = f"{rec.title}\n{rec.abstract}".lower()
-    for token in set(re.findall(r"[a-z0-9\-]{3,}", q)):
+    return frozenset(_TOKEN_RE.findall(q)), frozenset(q.split())
+
+
+def _score(rec: Record, tokens: frozenset, words: frozenset) -> float:
+    s = 0.0
+    title_lc = rec.title.lower()
+    hay = f"{title_lc}\n{rec.abstract.lower()}"
+    for token in tokens:
         if token in hay:
             s += 1.0
-    if MATERIALS_RE.search(hay) or MATERIALS_RE.search((rec.venue or "")):
+    if _MATERIALS_LC.search(hay) or _MATERIALS_LC.search((rec.venue or "").lower()):
         s += 2.5
-    if EXCLUDE_RE.search(hay):
+    if _EXCLUDE_LC.search(hay):
         s -= 3.0
-    if any(t in rec.title.lower() for t in set(q.split())):
+    if any(t in title_lc for t in words):
         s += 1.0
     if rec.pdf_url:
         s += 1.0
@@ -203,6 +340,17 @@ def score_record(rec: Record, query: str) -> float:
     return s
 
 
+def score_record(rec: Record, query: str) -> float:
+    return _score(rec, *_query_terms(query))
+
+
+def score_records(recs: List[Record], query: str) -> None:
+    """Set .score on every record; query tokens are extracted once for the batch."""
+    tokens, words = _query_terms(query)
+    for r in recs:
+        r.score = _score(r, tokens, words)
+
+
 # --------------------------- Normalization helper ---------------------------
 
 def make_record(
@@ -225,7 +373,7 @@ def make_record(
         url=norm(url) or None,
         pdf_url=norm(pdf_url) or None,
         venue=norm(venue) or None,
-        authors=[norm(a) for a in authors if norm(a)],
+        authors=[a for a in map(norm, authors) if a],
         source=source,
     )
 
@@ -255,17 +403,17 @@ def search_openalex(query: str, y0: int, y1: int, limit: int) -> List[Record]:
         if cursor:
             params["cursor"] = cursor
         data = _get_json(base, params=params)
-        for w in data.get("results", []):
+        for w in data.get("results") or []:
+            # Nested objects are looked up once; any of them may be JSON null
+            loc = w.get("primary_location") or {}
+            src = loc.get("source") or {}
             title = w.get("title") or ""
             doi = (w.get("doi") or "").replace("https://doi.org/", "") or None
-            url = (
-                w.get("primary_location", {}).get("source", {}).get("host_page_url")
-                or w.get("primary_location", {}).get("landing_page_url")
-            )
-            pdf = w.get("primary_location", {}).get("pdf_url") or (w.get("open_access", {}) or {}).get("oa_url")
+            url = src.get("host_page_url") or loc.get("landing_page_url")
+            pdf = loc.get("pdf_url") or (w.get("open_access") or {}).get("oa_url")
             year = safe_year(str(w.get("publication_year")))
-            venue = (w.get("host_venue", {}) or {}).get("display_name")
-            authors = [a.get("author", {}).get("display_name", "") for a in w.get("authorships", [])]
+            venue = (w.get("host_venue") or {}).get("display_name")
+            authors = [(a.get("author") or {}).get("display_name", "") for a in w.get("authorships") or []]
             out.append(
                 make_record(
                     title=title,
@@ -281,7 +429,7 @@ def search_openalex(query: str, y0: int, y1: int, limit: int) -> List[Record]:
             )
             if len(out) >= limit:
                 break
-        cursor = (data.get("meta", {}) or {}).get("next_cursor")
+        cursor = (data.get("meta") or {}).get("next_cursor")
         if not cursor:
             break
         time.sleep(random.uniform(0.1, 0.3))
@@ -302,14 +450,16 @@ def search_crossref(query: str, y0: int, y1: int, limit: int) -> List[Record]:
             "mailto": CROSSREF_EMAIL,
         }
         data = _get_json(base, params=params)
-        items = data.get("message", {}).get("items", [])
+        msg = data.get("message") or {}
+        items = msg.get("items") or []
         for it in items:
             title = (it.get("title") or [""])[0]
             doi = it.get("DOI")
             url = it.get("URL")
-            year = safe_year(str(it.get("issued", {}).get("date-parts", [[None]])[0][0]))
-            venue = it.get("container-title", [""])[0]
-            authors = [" ".join(filter(None, [a.get("given"), a.get("family")])) for a in it.get("author", [])]
+            parts = (it.get("issued") or {}).get("date-parts") or [[None]]
+            year = safe_year(str(parts[0][0] if parts[0] else None))
+            venue = (it.get("container-title") or [""])[0]
+            authors = [" ".join(filter(None, [a.get("given"), a.get("family")])) for a in it.get("author") or []]
             pdf_url = None
             for lk in (it.get("link", []) or []):
                 ct = (lk.get("content-type") or lk.get("content_type") or "").lower()
@@ -331,13 +481,16 @@ def search_crossref(query: str, y0: int, y1: int, limit: int) -> List[Record]:
             )
             if len(out) >= limit:
                 break
-        cursor = data.get("message", {}).get("next-cursor")
+        cursor = msg.get("next-cursor")
         if not cursor:
             break
         time.sleep(random.uniform(0.1, 0.3))
     return out
 
 
+_ATOM_NS = {"atom": "http://www.w3.org/2005/Atom"}
+
+
 def search_arxiv(query: str, y0: int, y1: int, limit: int) -> List[Record]:
     out: List[Record] = []
     base = "http://export.arxiv.org/api/query"
@@ -353,20 +506,22 @@ def search_arxiv(query: str, y0: int, y1: int, limit: int) -> List[Record]:
             "sortOrder": "descending",
         }
         text = _get_text(base, params=params, headers={"Accept": "application/atom+xml"})
-        for entry in re.split(r"</entry>", text):
-            t = re.search(r"<title>(.*?)</title>", entry, re.S)
-            if not t:
+        entries = ET.fromstring(text.encode("utf-8")).findall("atom:entry", _ATOM_NS)
+        for entry in entries:
+            title = norm(_WS.sub(" ", entry.findtext("atom:title", "", _ATOM_NS)))
+            if not title:
                 continue
-            title = norm(re.sub(r"\s+", " ", t.group(1)))
-            abs_m = re.search(r"<summary>(.*?)</summary>", entry, re.S)
-            abstract = norm(re.sub(r"\s+", " ", abs_m.group(1))) if abs_m else ""
-            year = int(re.search(r"<published>(\d{4})-", entry).group(1)) if re.search(r"<published>(\d{4})-", entry) else None
+            abstract = norm(_WS.sub(" ", entry.findtext("atom:summary", "", _ATOM_NS)))
+            published = entry.findtext("atom:published", "", _ATOM_NS)
+            year = int(published[:4]) if published[:4].isdigit() else None
             if year and not (y0 <= year <= y1):
                 continue
-            url_m = re.search(r"<id>(.*?)</id>", entry)
-            url = url_m.group(1) if url_m else None
-            pdf_m = re.search(r'href="(https?://arxiv.org/pdf/[^"]+)"', entry)
-            pdf_url = pdf_m.group(1) if pdf_m else None
+            url = entry.findtext("atom:id", None, _ATOM_NS)
+            pdf_url = None
+            for link in entry.iterfind("atom:link", _ATOM_NS):
+                if link.get("title") == "pdf" or link.get("type") == "application/pdf":
+                    pdf_url = link.get("href")
+                    break
             out.append(
                 make_record(
                     title=title,
@@ -382,7 +537,7 @@ def search_arxiv(query: str, y0: int, y1: int, limit: int) -> List[Record]:
             )
             if len(out) >= limit:
                 break
-        if len(out) >= limit or ("</feed>" in text and "<entry>" not in text):
+        if len(out) >= limit or not entries:
             break
         start += step
         time.sleep(random.uniform(0.1, 0.3))
@@ -397,7 +552,6 @@ def search_semantic_scholar(query: str, y0: int, y1: int, limit: int) -> List[Re
     """
     out: List[Record] = []
     key = os.getenv("SEMANTIC_SCHOLAR_API_KEY")
-    print(f'\n\n\n{key}\n\n\n')
     headers = {"x-api-key": key} if key else {}
     base = "https://api.semanticscholar.org/graph/v1/paper/search"
     offset = 0
@@ -427,10 +581,10 @@ def search_semantic_scholar(query: str, y0: int, y1: int, limit: int) -> List[Re
                     use_fields = False  # stick to no-fields for subsequent pages
                 except Exception:
                     # Give up on S2 for this run
-                    print(f"[warn] SemanticScholar failed: {e}")
+                    log.warning("[warn] SemanticScholar failed: %s", e)
                     break
             else:
-                print(f"[warn] SemanticScholar failed: {e}")
+                log.warning("[warn] SemanticScholar failed: %s", e)
                 break
 
         items = data.get("data", [])
@@ -472,7 +626,7 @@ def search_semantic_scholar(query: str, y0: int, y1: int, limit: int) -> List[Re
         time.sleep(random.uniform(0.1, 0.3))
 
     if not key:
-        print("[warn] Semantic Scholar key not set; results limited by public quota.")
+        log.warning("[warn] Semantic Scholar key not set; results limited by public quota.")
     return out
 
 
@@ -481,7 +635,7 @@ def search_doaj(query: str, y0: int, y1: int, limit: int) -> List[Record]:
     """
     Fixed to DOAJ v4:
     - Endpoint: /api/search/articles/{URL-ENCODED-QUERY}
-    - Params: page, page_size
+    - Params: page, page_size, sort (newest first)
     - Query includes date filter on created_date
     """
     out: List[Record] = []
@@ -492,22 +646,23 @@ def search_doaj(query: str, y0: int, y1: int, limit: int) -> List[Record]:
     q = f"{query} AND created_date:[{y0}-01-01 TO {y1}-12-31]"
     q_path = base + quote(q, safe="")
     while len(out) < limit:
-        params = {"page": page, "page_size": step}
+        params = {"page": page, "page_size": step, "sort": "created_date:desc"}
         data = _get_json(q_path, params=params)
-        results = data.get("results", [])
+        results = data.get("results") or []
         for r in results:
-            bib = r.get("bibjson", {})
+            bib = r.get("bibjson") or {}
             title = bib.get("title", "")
             abstract = bib.get("abstract", "")
             year = safe_year(str(bib.get("year")))
-            doi = next((iden.get("id") for iden in bib.get("identifier", []) if iden.get("type") == "doi"), None)
-            url = (bib.get("link", [{}])[0] or {}).get("url")
+            doi = next((iden.get("id") for iden in bib.get("identifier") or [] if iden.get("type") == "doi"), None)
+            links = bib.get("link") or []
+            url = (links[0] if links else {}).get("url")
             pdf = None
-            for lk in bib.get("link", []):
+            for lk in links:
                 if (lk.get("type") == "fulltext") and (lk.get("content_type", "") or "").lower() == "application/pdf":
                     pdf = lk.get("url")
-            venue = (bib.get("journal", {}) or {}).get("title")
-            authors = [a.get("name", "") for a in bib.get("author", [])]
+            venue = (bib.get("journal") or {}).get("title")
+            authors = [a.get("name", "") for a in bib.get("author") or []]
             out.append(
                 make_record(
                     title=title,
@@ -523,22 +678,55 @@ def search_doaj(query: str, y0: int, y1: int, limit: int) -> List[Record]:
             )
             if len(out) >= limit:
                 break
-        if not results:
+        # A short page is the last one; don't spend a request on the empty page after it
+        if len(results) < step or page * step >= (data.get("total") or 0):
             break
         page += 1
         time.sleep(random.uniform(0.1, 0.3))
     return out
 
 
+PUBMED_SUMMARY_BATCH = 500
+
+
+def _pubmed_summaries(
+    webenv: str, query_key: str, total: int, email: str, tool: str
+) -> Iterable[Dict[str, Any]]:
+    """Yield ESummary documents from the ESearch history server, POSTing one batch at a time."""
+    esummary = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
+    for start in range(0, total, PUBMED_SUMMARY_BATCH):
+        data = {
+            "db": "pubmed",
+            "WebEnv": webenv,
+            "query_key": query_key,
+            "retstart": start,
+            "retmax": min(PUBMED_SUMMARY_BATCH, total - start),
+            "retmode": "json",
+            "tool": tool,
+            "email": email,
+        }
+        res = _post_json(esummary, data).get("result") or {}
+        uids = res.get("uids") or []
+        if not uids:
+            return
+        for pid in uids:
+            yield res.get(pid) or {}
+        if start + PUBMED_SUMMARY_BATCH < total:
+            time.sleep(0.34)  # NCBI allows 3 requests/s without an API key
+
+
 def search_pubmed(query: str, y0: int, y1: int, limit: int) -> List[Record]:
     out: List[Record] = []
     email = CROSSREF_EMAIL
     tool = "materials-papers-harvester"
     esearch = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
+    # History mode: ESearch keeps the ID list server-side and ESummary pages through it,
+    # so large result sets never have to be sent back as a comma-joined id= parameter.
     params = {
         "db": "pubmed",
         "term": f"{query}",
-        "retmax": min(10000, limit),
+        "retmax": 0,
+        "usehistory": "y",
         "retmode": "json",
         "tool": tool,
         "email": email,
@@ -546,15 +734,12 @@ def search_pubmed(query: str, y0: int, y1: int, limit: int) -> List[Record]:
         "maxdate": y1,
     }
     data = _get_json(esearch, params=params)
-    ids = (data.get("esearchresult", {}) or {}).get("idlist", [])
-    if not ids:
+    result = data.get("esearchresult") or {}
+    webenv, query_key = result.get("webenv"), result.get("querykey")
+    total = min(int(result.get("count") or 0), limit, 10000)
+    if not total or not webenv or not query_key:
         return out
-    esummary = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
-    params = {"db": "pubmed", "id": ",".join(ids), "retmode": "json"}
-    summ = _get_json(esummary, params=params)
-    res = summ.get("result", {}) or {}
-    for pid in ids:
-        it = res.get(pid) or {}
+    for it in _pubmed_summaries(webenv, query_key, total, email, tool):
         title = it.get("title", "")
         abstract = ""
         year = safe_year(it.get("pubdate"))
@@ -565,7 +750,7 @@ def search_pubmed(query: str, y0: int, y1: int, limit: int) -> List[Record]:
                     doi = iden.get("value")
         url = it.get("elocationid") or it.get("sortfirstauthor")
         venue = it.get("source")
-        authors = [a.get("name", "") for a in it.get("authors", [])]
+        authors = [a.get("name", "") for a in it.get("authors") or []]
         out.append(
             make_record(
                 title=title,
@@ -587,7 +772,7 @@ def search_pubmed(query: str, y0: int, y1: int, limit: int) -> List[Record]:
 def search_springer(query: str, y0: int, y1: int, limit: int) -> List[Record]:
     key = os.getenv("SPRINGER_API_KEY")
     if not key:
-        print("[warn] SPRINGER_API_KEY not set; skipping Springer.")
+        log.warning("[warn] SPRINGER_API_KEY not set; skipping Springer.")
         return []
     out: List[Record] = []
     base = "https://api.springernature.com/metadata/json"
@@ -637,7 +822,7 @@ def search_springer(query: str, y0: int, y1: int, limit: int) -> List[Record]:
 def search_sciencedirect(query: str, y0: int, y1: int, limit: int) -> List[Record]:
     key = os.getenv("ELSEVIER_API_KEY")
     if not key:
-        print("[warn] ELSEVIER_API_KEY not set; skipping ScienceDirect.")
+        log.warning("[warn] ELSEVIER_API_KEY not set; skipping ScienceDirect.")
         return []
     out: List[Record] = []
     base = "https://api.elsevier.com/content/search/sciencedirect"
@@ -684,7 +869,7 @@ def search_sciencedirect(query: str, y0: int, y1: int, limit: int) -> List[Recor
 def search_ieee(query: str, y0: int, y1: int, limit: int) -> List[Record]:
     key = os.getenv("IEEE_API_KEY")
     if not key:
-        print("[warn] IEEE_API_KEY not set; skipping IEEE Xplore.")
+        log.warning("[warn] IEEE_API_KEY not set; skipping IEEE Xplore.")
         return []
     out: List[Record] = []
     base = "https://ieeexploreapi.ieee.org/api/v1/search/articles"
@@ -710,7 +895,7 @@ def search_ieee(query: str, y0: int, y1: int, limit: int) -> List[Record]:
             pdf = a.get("pdf_url")
             venue = a.get("publication_title")
             authors = (
-                [au.get("full_name", "") for au in a.get("authors", {}).get("authors", [])]
+                [au.get("full_name", "") for au in (a.get("authors") or {}).get("authors") or []]
                 if isinstance(a.get("authors"), dict)
                 else []
             )
@@ -738,81 +923,199 @@ def search_ieee(query: str, y0: int, y1: int, limit: int) -> List[Record]:
 
 # --------------------------- Enrichment: Unpaywall ---------------------------
 
-def enrich_unpaywall(recs: List[Record]) -> None:
-    """Fill missing pdf_url/url from Unpaywall (when DOI present)."""
-    for r in recs:
-        if r.pdf_url or not r.doi:
-            continue
-        url = f"https://api.unpaywall.org/v2/{r.doi}"
-        try:
-            data = _get_json(url, params={"email": UNPAYWALL_EMAIL})
-        except Exception:
-            continue
-        candidates = []
-        best = (data.get("best_oa_location") or {})
-        if best:
-            candidates.append(best)
-        candidates += (data.get("oa_locations") or [])
-        for c in candidates:
-            if not r.pdf_url and c.get("url_for_pdf"):
-                r.pdf_url = c["url_for_pdf"]
-            if not r.url and c.get("url"):
-                r.url = c["url"]
-            if r.pdf_url:
-                break
-        time.sleep(random.uniform(0.05, 0.15))
+UNPAYWALL_WORKERS = 16  # concurrent DOI lookups; keeps us well inside Unpaywall's soft limit
+
+
+@lru_cache(maxsize=100_000)
+def unpaywall_lookup(doi: str) -> Dict[str, Any]:
+    """Unpaywall record for a DOI ({} if unknown), memoised so pass 2 reuses pass 1's answers.
+
+    run() clears the memo at the start of each harvest.
+
+    The returned dict is shared between callers and must not be mutated.
+    Transient errors raise and are therefore not cached.
+    """
+    try:
+        return _get_json(
+            f"https://api.unpaywall.org/v2/{doi}", params={"email": UNPAYWALL_EMAIL}, session=CACHED_SESSION
+        )
+    except requests.HTTPError as e:
+        if e.response is not None and e.response.status_code == 404:
+            return {}
+        raise
+
+
+def _unpaywall_one(r: Record) -> None:
+    try:
+        data = unpaywall_lookup(r.doi)
+    except Exception:
+        return
+    candidates = []
+    best = (data.get("best_oa_location") or {})
+    if best:
+        candidates.append(best)
+    candidates += (data.get("oa_locations") or [])
+    for c in candidates:
+        if not r.pdf_url and c.get("url_for_pdf"):
+            r.pdf_url = c["url_for_pdf"]
+        if not r.url and c.get("url"):
+            r.url = c["url"]
+        if r.pdf_url:
+            break
+    time.sleep(random.uniform(0.05, 0.15))
+
+
+def enrich_unpaywall(recs: List[Record], *, cancel: Optional[threading.Event] = None) -> None:
+    """Fill missing pdf_url/url from Unpaywall (when DOI present), several DOIs at a time."""
+    todo = [r for r in recs if not r.pdf_url and r.doi]
+
+    def work(r: Record) -> None:
+        if not (cancel and cancel.is_set()):
+            _unpaywall_one(r)
+
+    with ThreadPoolExecutor(max_workers=UNPAYWALL_WORKERS, thread_name_prefix="unpaywall") as ex:
+        for _ in ex.map(work, todo):
+            pass
 
 
 # --------------------------- Enrichment: landing-page scraping ---------------
 
+LANDING_WORKERS = 16  # landing pages fetched at once, across all publishers
+LANDING_PER_HOST = 2  # ...but never more than this many against one publisher
+
+_host_locks: Dict[str, threading.BoundedSemaphore] = {}
+_host_next_start: Dict[str, float] = {}  # monotonic time before which a host gets no new request
+_host_locks_guard = threading.Lock()
+
+
+DOI_PROXIES = frozenset({"doi.org", "dx.doi.org"})  # redirectors, not publishers: never capped
+
+
+def landing_host(url: str) -> str:
+    return (urlparse(url).hostname or "").lower() if url else ""
+
+
+def landing_url(url: Optional[str], doi: Optional[str]) -> str:
+    """The publisher page a record points at, with doi.org links and bare DOIs resolved.
+
+    Crossref hands out http://dx.doi.org/... as the record URL, so resolving first is
+    what lets the per-host cap and spacing land on the real publisher.
+    """
+    url = (url or "").strip()
+    if url and landing_host(url) not in DOI_PROXIES:
+        return url
+    key = doi_key(url) if url else doi_key(doi)
+    return (resolve_doi(key) if key else "") or url
+
+
+def host_semaphore(host: str) -> threading.BoundedSemaphore:
+    """Per-host concurrency cap shared by all landing-page workers."""
+    with _host_locks_guard:
+        sem = _host_locks.get(host)
+        if sem is None:
+            sem = _host_locks[host] = threading.BoundedSemaphore(LANDING_PER_HOST)
+        return sem
+
+
+def host_pace(host: str, interval: float) -> None:
+    """Wait until `interval` seconds have passed since the last request slot handed out for `host`."""
+    with _host_locks_guard:
+        now = time.monotonic()
+        start = max(now, _host_next_start.get(host, 0.0))
+        _host_next_start[host] = start + interval
+    if start > now:
+        time.sleep(start - now)
+
+
+@lru_cache(maxsize=50_000)
+def _resolve_doi(doi: str) -> str:
+    """Publisher URL for a DOI, read from doi.org's redirect without fetching the publisher page."""
+    url = f"https://doi.org/{doi}"
+    for _ in range(3):  # doi.org occasionally bounces through itself (http -> https, dx.)
+        r = CACHED_SCRAPE_SESSION.get(url, allow_redirects=False, timeout=25)
+        r.raise_for_status()
+        if not r.is_redirect:
+            return r.url
+        url = urljoin(url, r.headers["Location"])
+        if landing_host(url) not in DOI_PROXIES:
+            return url
+    raise requests.TooManyRedirects(url)
+
+
 def resolve_doi(doi: str) -> str:
     try:
-        r = SESSION.get(f"https://doi.org/{doi}", allow_redirects=True, timeout=25)
-        r.raise_for_status()
-        return r.url
+        return _resolve_doi(doi)
     except Exception:
-        return ""
+        return ""  # failures are not memoised
+
+
+_confirmed_pdfs: set = set()  # URLs seen serving a PDF in this run; negatives are never kept
+
+
+def _sniff_pdf(url: str) -> bool:
+    """One ranged GET for the 5-byte magic (or a PDF Content-Type); errors raise."""
+    headers = {"Range": "bytes=0-4"}
+    for _ in range(2):
+        with SCRAPE_SESSION.get(url, headers=headers, stream=True, allow_redirects=True, timeout=20) as r:
+            if r.status_code == 416 and headers:
+                headers = {}  # server rejects the range; retry once as a plain streamed GET
+                continue
+            r.raise_for_status()
+            if "application/pdf" in (r.headers.get("Content-Type") or "").lower():
+                return True
+            return r.raw.read(5, decode_content=True) == b"%PDF-"
+    return False
 
 
 def validate_pdf(url: str, validate=True) -> bool:
+    """True if the URL serves a PDF; a confirmed PDF shared by several records is probed once.
+
+    Only positive answers are remembered: a captcha page, an HTML interstitial or a
+    failed request may well succeed for the next record pointing at the same URL.
+    """
     if not validate:
         return True
+    if url in _confirmed_pdfs:
+        return True
     try:
-        r = SESSION.head(url, allow_redirects=True, timeout=20)
-        ctype = (r.headers.get("Content-Type") or "").lower()
-        if "application/pdf" in ctype:
-            return True
-    except Exception:
-        pass
-    try:
-        r = SESSION.get(url, stream=True, timeout=25)
-        r.raise_for_status()
-        chunk = next(r.iter_content(2048), b"")
-        if chunk[:5] == b"%PDF-":
-            return True
+        ok = _sniff_pdf(url)
     except Exception:
         return False
-    return False
+    if ok:
+        _confirmed_pdfs.add(url)
+    return ok
 
 
 def fetch_html(url: str) -> str:
     try:
-        r = SESSION.get(url, timeout=25)
+        r = CACHED_SCRAPE_SESSION.get(url, timeout=25)
         r.raise_for_status()
         return r.text
     except Exception:
         return ""
 
 
+_CITATION_PDF_RE = re.compile(r'citation_pdf_url"\s*content="([^"]+)"', re.I)
+_PDF_HREF_RE = re.compile(r'href="([^"]+\.pdf)"', re.I)
+_PMC_HREF_RE = re.compile(r'href="(https://www\.ncbi\.nlm\.nih\.gov/pmc/articles/[^"]+)"', re.I)
+_META_PDF_NAME_RE = re.compile(r"^citation_pdf_url$", re.I)
+_PDF_TYPE_RE = re.compile(r"application/pdf", re.I)
+
+
 def find_pdf_generic(html: str, base_url: str) -> str:
     if BeautifulSoup:
-        soup = BeautifulSoup(html, "html.parser")
-        m = soup.find("meta", attrs={"name": re.compile(r"^citation_pdf_url$", re.I)})
+        # Only the tags we inspect are built into the tree; the rest of the page is skipped
+        soup = BeautifulSoup(html, BS_PARSER, parse_only=SoupStrainer(["meta", "link", "a"]))
+        m = soup.find("meta", attrs={"name": _META_PDF_NAME_RE})
         if m and m.get("content"):
             return urljoin(base_url, m["content"].strip())
-        l = soup.find("link", attrs={"type": re.compile(r"application/pdf", re.I)})
+        l = soup.find("link", attrs={"type": _PDF_TYPE_RE})
         if l and l.get("href"):
             return urljoin(base_url, l["href"].strip())
+        # Publisher download buttons (Nature/Springer) are tagged regardless of attribute order
+        btn = soup.select_one('a[data-track-action="download pdf" i][href]')
+        if btn:
+            return urljoin(base_url, btn["href"].strip())
         cands = []
         for a in soup.find_all("a", href=True):
             href = a["href"]
@@ -826,70 +1129,62 @@ def find_pdf_generic(html: str, base_url: str) -> str:
         cands.sort(key=lambda u: (0 if u.lower().endswith(".pdf") else 1, len(u)))
         return cands[0] if cands else ""
     # Regex fallback
-    m = re.search(r'citation_pdf_url"\s*content="([^"]+)"', html, flags=re.I)
+    m = _CITATION_PDF_RE.search(html)
     if m:
         return urljoin(base_url, m.group(1))
-    m = re.search(r'href="([^"]+\.pdf)"', html, flags=re.I)
+    m = _PDF_HREF_RE.search(html)
     return urljoin(base_url, m.group(1)) if m else ""
 
 
+# Publisher-specific PDF link patterns, tried in order. Keyed by host suffix:
+# find_pdf_domain walks the landing host up label by label (one dict lookup each).
+_SPRINGER_PDF = [
+    re.compile(r'href="(/content/pdf/[^"]+\.pdf)"', re.I),
+    re.compile(r'"pdfUrl"\s*:\s*"([^"]+)"'),
+]
+_DOMAIN_PDF_PATTERNS = {
+    "springer.com": _SPRINGER_PDF,
+    "springeropen.com": _SPRINGER_PDF,
+    "wiley.com": [
+        re.compile(r'href="(/doi/(?:pdfdirect|pdf)/[^"]+)"', re.I),
+        _CITATION_PDF_RE,
+    ],
+    "pubs.acs.org": [
+        re.compile(r'href="(/doi/(?:pdf|epdf)/[^"]+)"', re.I),
+        _CITATION_PDF_RE,
+    ],
+    "rsc.org": [
+        re.compile(r'href="([^"]+/(?:articlepdf|content/articlepdf)/[^"]+\.pdf)"', re.I),
+    ],
+    "mdpi.com": [
+        re.compile(r'href="([^"]+/pdf(?:\?[^"]*)?)"', re.I),
+        re.compile(r'href="([^"]+/pdf-download[^"]*)"', re.I),
+    ],
+    "ieeexplore.ieee.org": [
+        re.compile(r'href="(/stamp/stamp\.jsp[^"]+)"', re.I),
+    ],
+    "nature.com": [
+        re.compile(r'href="([^"]+\.pdf)"[^>]*data-track-action="download pdf"', re.I),
+    ],
+    "sciencedirect.com": [
+        re.compile(r'"pdfDownload"\s*:\s*\{\s*"url"\s*:\s*"([^"]+)"', re.I | re.S),
+        re.compile(r'href="([^"]+/pdf(?:ft)?[^"]*)"', re.I),
+    ],
+}
+
+
 def find_pdf_domain(html: str, base_url: str) -> str:
-    host = urlparse(base_url).netloc.lower()
-    # Springer
-    if "springer" in host:
-        m = re.search(r'href="(/content/pdf/[^"]+\.pdf)"', html, flags=re.I)
-        if m:
-            return urljoin(base_url, m.group(1))
-        m = re.search(r'"pdfUrl"\s*:\s*"([^"]+)"', html)
-        if m:
-            return urljoin(base_url, m.group(1))
-    # Wiley
-    if "wiley.com" in host:
-        m = re.search(r'href="(/doi/(?:pdfdirect|pdf)/[^"]+)"', html, flags=re.I)
-        if m:
-            return urljoin(base_url, m.group(1))
-        m = re.search(r'citation_pdf_url"\s*content="([^"]+)"', html, flags=re.I)
-        if m:
-            return urljoin(base_url, m.group(1))
-    # ACS
-    if "pubs.acs.org" in host:
-        m = re.search(r'href="(/doi/(?:pdf|epdf)/[^"]+)"', html, flags=re.I)
-        if m:
-            return urljoin(base_url, m.group(1))
-        m = re.search(r'citation_pdf_url"\s*content="([^"]+)"', html, flags=re.I)
-        if m:
-            return urljoin(base_url, m.group(1))
-    # RSC
-    if "rsc.org" in host:
-        m = re.search(r'href="([^"]+/(?:articlepdf|content/articlepdf)/[^"]+\.pdf)"', html, flags=re.I)
-        if m:
-            return urljoin(base_url, m.group(1))
-    # MDPI
-    if "mdpi.com" in host:
-        m = re.search(r'href="([^"]+/pdf(?:\?[^"]*)?)"', html, flags=re.I)
-        if m:
-            return urljoin(base_url, m.group(1))
-        m = re.search(r'href="([^"]+/pdf-download[^"]*)"', html, flags=re.I)
-        if m:
-            return urljoin(base_url, m.group(1))
-    # IEEE Xplore
-    if "ieeexplore.ieee.org" in host:
-        m = re.search(r'href="(/stamp/stamp\.jsp[^"]+)"', html, flags=re.I)
-        if m:
-            return urljoin(base_url, m.group(1))
-    # Nature
-    if "nature.com" in host:
-        m = re.search(r'href="([^"]+\.pdf)"[^>]*data-track-action="download pdf"', html, flags=re.I)
-        if m:
-            return urljoin(base_url, m.group(1))
-    # ScienceDirect
-    if "sciencedirect.com" in host:
-        m = re.search(r'"pdfDownload"\s*:\s*\{\s*"url"\s*:\s*"([^"]+)"', html, flags=re.I | re.S)
-        if m:
-            return urljoin(base_url, m.group(1))
-        m = re.search(r'href="([^"]+/pdf(?:ft)?[^"]*)"', html, flags=re.I)
-        if m:
-            return urljoin(base_url, m.group(1))
+    host = urlparse(base_url).hostname or ""
+    suffix = host
+    while suffix:
+        patterns = _DOMAIN_PDF_PATTERNS.get(suffix)
+        if patterns is not None:
+            for pat in patterns:
+                m = pat.search(html)
+                if m:
+                    return urljoin(base_url, m.group(1))
+            break
+        suffix = suffix.partition(".")[2]
     # PMC
     if "ncbi.nlm.nih.gov" in host and "/pmc/articles/" in base_url:
         return base_url.rstrip("/") + "/pdf"
@@ -897,19 +1192,17 @@ def find_pdf_domain(html: str, base_url: str) -> str:
 
 
 def pick_pdf_from(landing_url: str, doi: Optional[str], validate=True) -> str:
-    # Try Unpaywall again (sometimes it backfills)
+    # Unpaywall's answer from pass 1 (memoised), this time taking the landing URL too
     if doi:
         try:
-            j = _get_json(f"https://api.unpaywall.org/v2/{doi}", params={"email": UNPAYWALL_EMAIL})
+            j = unpaywall_lookup(doi)
             loc = j.get("best_oa_location") or j.get("oa_location")
             cand = (loc or {}).get("url_for_pdf") or (loc or {}).get("url")
             if cand and (not validate or validate_pdf(cand, validate=True)):
                 return cand
         except Exception:
             pass
-    landing = (landing_url or "").strip()
-    if not landing and doi:
-        landing = resolve_doi(doi)
+    landing = (landing_url or "").strip()  # already resolved past doi.org by the caller
     if not landing:
         return ""
     html = fetch_html(landing)
@@ -917,13 +1210,12 @@ def pick_pdf_from(landing_url: str, doi: Optional[str], validate=True) -> str:
         return ""
     cand = find_pdf_domain(html, landing) or find_pdf_generic(html, landing)
     if cand:
-        if not validate or validate_pdf(cand, validate=True) or cand.lower().endswith(".pdf"):
+        # A .pdf link is accepted either way, so it is not worth a validation request
+        if not validate or cand.lower().endswith(".pdf") or validate_pdf(cand, validate=True):
             return cand
     # PubMed → PMC
     if "pubmed.ncbi.nlm.nih.gov" in landing:
-        m = re.search(
-            r'href="(https://www\.ncbi\.nlm\.nih\.gov/pmc/articles/[^"]+)"', html, flags=re.I
-        )
+        m = _PMC_HREF_RE.search(html)
         if m:
             pmc = m.group(1)
             pdf = pmc.rstrip("/") + "/pdf"
@@ -933,37 +1225,75 @@ def pick_pdf_from(landing_url: str, doi: Optional[str], validate=True) -> str:
 
 
 def enrich_from_landing(
-    recs: List[Record], *, validate: bool = True, sleep: float = 0.5, verbose: bool = False
+    recs: List[Record],
+    *,
+    validate: bool = True,
+    sleep: float = 0.5,
+    cancel: Optional[threading.Event] = None,
 ) -> int:
-    """Second-pass PDF fill: for records missing pdf_url but having url/doi."""
+    """Second-pass PDF fill: for records missing pdf_url but having url/doi.
+
+    Records are processed LANDING_WORKERS at a time; `sleep` is the minimum spacing
+    between requests to the same publisher (other hosts are not held up).
+    """
     to_fill = [r for r in recs if not (r.pdf_url or "") and ((r.url or "") or (r.doi or ""))]
-    print(f"[info] Second-pass PDF enrichment candidates: {len(to_fill)}")
-    filled = 0
-    for r in to_fill:
-        pdf = pick_pdf_from(r.url or "", r.doi, validate=validate)
+    log.info("[info] Second-pass PDF enrichment candidates: %d", len(to_fill))
+    log.info("[landing] 0/%d", len(to_fill))
+
+    def work(r: Record) -> str:
+        if cancel and cancel.is_set():
+            return ""
+        landing = landing_url(r.url, r.doi)
+        host = landing_host(landing)
+        capped = host and host not in DOI_PROXIES
+        with host_semaphore(host) if capped else nullcontext():
+            if capped:
+                host_pace(host, sleep)
+            pdf = pick_pdf_from(landing, r.doi, validate=validate)
         if pdf:
             r.pdf_url = pdf
-            filled += 1
-            if verbose:
-                print(f"  [+] {r.title[:80]} → {pdf}")
-        time.sleep(sleep)
-    print(f"[ok] Second-pass filled {filled} pdf_url fields")
+            log.debug("  [+] %.80s → %s", r.title, pdf)  # only formatted with --verbose
+        return pdf
+
+    filled = 0
+    with ThreadPoolExecutor(max_workers=LANDING_WORKERS, thread_name_prefix="landing") as ex:
+        futures = [ex.submit(work, r) for r in to_fill]
+        for i, fut in enumerate(as_completed(futures), 1):
+            if fut.result():
+                filled += 1
+            if i % 10 == 0 or i == len(to_fill):
+                log.info("[landing] %d/%d", i, len(to_fill))  # progress marker parsed by app.py
+    log.info("[ok] Second-pass filled %d pdf_url fields", filled)
     return filled
 
 
 # --------------------------- Deduplication ---------------------------
 
+_DOI_PREFIX = re.compile(r"^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)", re.I)
+_NONWORD_RE = re.compile(r"\W+")
+
+
+def title_key(title: str) -> str:
+    """Lowercased title with punctuation and spaces removed; the fuzzy-dedup key."""
+    return _NONWORD_RE.sub("", title.lower())
+
+
+def doi_key(doi: Optional[str]) -> str:
+    """Canonical DOI for comparisons: DOIs are case-insensitive and sources vary the prefix."""
+    return _DOI_PREFIX.sub("", (doi or "").strip()).lower()
+
+
 def deduplicate(records: List[Record]) -> List[Record]:
     by_doi: Dict[str, Record] = {}
     out: List[Record] = []
     for r in records:
-        if r.doi:
-            if r.doi not in by_doi:
-                by_doi[r.doi] = r
-            else:
-                cur = by_doi[r.doi]
-                if (not cur.pdf_url and r.pdf_url) or (len(r.abstract) > len(cur.abstract)):
-                    by_doi[r.doi] = r
+        key = doi_key(r.doi)
+        if key:
+            cur = by_doi.get(key)
+            if cur is None:
+                by_doi[key] = r
+            elif (not cur.pdf_url and r.pdf_url) or (len(r.abstract) > len(cur.abstract)):
+                by_doi[key] = r
         else:
             out.append(r)
     merged = list(by_doi.values()) + out
@@ -971,29 +1301,38 @@ def deduplicate(records: List[Record]) -> List[Record]:
         seen = set()
         uniq: List[Record] = []
         for r in merged:
-            key = re.sub(r"\W+", "", r.title.lower())[:80]
+            key = title_key(r.title)[:80]
+            if not key:
+                uniq.append(r)  # nothing to compare on; never collapse untitled records
+                continue
             if key in seen:
                 continue
             seen.add(key)
             uniq.append(r)
         return uniq
+    # Candidates come from a character-trigram inverted index over the kept keys. A
+    # QRatio >= 95 duplicate shares well over 60% of a title's trigrams, and any key
+    # sharing that many must contain one of the rarest len(grams) - need + 1 of them, so
+    # only those postings are probed (common trigrams like "ion" never are). rapidfuzz
+    # then does the exact check on the shortlist.
     keys: List[str] = []
     uniq2: List[Record] = []
-    for r in merged:
-        key = re.sub(r"\W+", "", r.title.lower())
-        if not keys:
-            keys.append(key)
-            uniq2.append(r)
+    postings: Dict[str, List[int]] = {}
+    all_keys = [title_key(r.title) for r in merged]  # normalise each title once
+    for r, key in zip(merged, all_keys):
+        if not key:
+            uniq2.append(r)  # nothing to compare on; never collapse untitled records
             continue
-        bucket_idx = [i for i, k in enumerate(keys) if k[:12] == key[:12]]
-        if not bucket_idx:
-            sample_idx = random.sample(range(len(keys)), k=min(30, len(keys))) if keys else []
-            bucket_idx = sample_idx
-        if bucket_idx:
-            candidates = [keys[i] for i in bucket_idx]
-            best = rf_process.extractOne(key, candidates, scorer=fuzz.QRatio)
-            if best and best[1] >= 95:
-                continue
+        grams = frozenset(key[i:i + 3] for i in range(len(key) - 2)) or frozenset((key,))
+        need = math.ceil(0.6 * len(grams))
+        probe = sorted(grams, key=lambda g: len(postings.get(g, ())))[: len(grams) - need + 1]
+        shortlist = {i for g in probe for i in postings.get(g, ())}
+        candidates = [keys[i] for i in shortlist]
+        # score_cutoff lets rapidfuzz skip candidates early and return None below 95
+        if candidates and rf_process.extractOne(key, candidates, scorer=fuzz.QRatio, score_cutoff=95):
+            continue
+        for g in grams:
+            postings.setdefault(g, []).append(len(keys))
         keys.append(key)
         uniq2.append(r)
     return uniq2
@@ -1024,64 +1363,86 @@ def run(
     out_csv: Optional[str],
     *,
     validate_pdf_links: bool = True,
+    cancel: Optional[threading.Event] = None,
 ) -> None:
-    all_recs: List[Record] = []
-    for name, func in SOURCES:
-        try:
-            print(f"[info] Querying {name}...")
-            recs = func(query, y0, y1, max_per_source)
-            print(f"[info] {name}: {len(recs)} records")
-            all_recs.extend(recs)
-        except Exception as e:
-            print(f"[warn] {name} failed: {e}")
-        time.sleep(random.uniform(0.1, 0.3))
+    """Harvest, enrich, score, dedupe and export.
+
+    `cancel` lets an embedding caller (the Streamlit app) stop the run between
+    sources and enrichment steps; nothing is written once it is set.
+    """
+    # Lookup memos are per harvest: the app imports this module once for the whole
+    # server process, and OA status / link availability can change between runs.
+    unpaywall_lookup.cache_clear()
+    _resolve_doi.cache_clear()
+    _confirmed_pdfs.clear()
+
+    # Sources are independent and network-bound, so they are all queried at once;
+    # results are merged in SOURCES order to keep the output deterministic.
+    def _search(name, func):
+        log.info("[info] Querying %s...", name)
+        return func(query, y0, y1, max_per_source)
+
+    results: Dict[str, List[Record]] = {}
+    ex = ThreadPoolExecutor(max_workers=len(SOURCES), thread_name_prefix="source")
+    pending = {ex.submit(_search, name, func): name for name, func in SOURCES}
+    done_count = 0
+    try:
+        while pending and not (cancel and cancel.is_set()):
+            done, _ = wait(pending, timeout=0.5, return_when=FIRST_COMPLETED)
+            for fut in done:
+                name = pending.pop(fut)
+                try:
+                    results[name] = fut.result()
+                    log.info("[info] %s: %d records", name, len(results[name]))
+                except Exception as e:
+                    log.warning("[warn] %s failed: %s", name, e)
+                done_count += 1
+                log.info("[sources] %d/%d", done_count, len(SOURCES))
+    finally:
+        # On cancel, stragglers finish in the background and their results are dropped
+        ex.shutdown(wait=not pending, cancel_futures=True)
+    all_recs: List[Record] = [r for name, _ in SOURCES for r in results.get(name, [])]
+
+    # Dedupe first: the same paper from several sources is then looked up and scraped once
+    n_fetched = len(all_recs)
+    all_recs = deduplicate(all_recs)
+    log.info("[info] %d records after dedup (%d fetched)", len(all_recs), n_fetched)
 
     # Enrichment passes
-    enrich_unpaywall(all_recs)  # pass 1
-    enrich_from_landing(all_recs, validate=validate_pdf_links, sleep=0.5, verbose=False)  # pass 2
+    enrich_unpaywall(all_recs, cancel=cancel)  # pass 1
+    enrich_from_landing(
+        all_recs, validate=validate_pdf_links, sleep=0.5, cancel=cancel
+    )  # pass 2
+    if cancel and cancel.is_set():
+        log.warning("[warn] Cancelled; no output written.")
+        return
 
     # Score + strict filter
-    for r in all_recs:
-        r.score = score_record(r, query)
+    score_records(all_recs, query)
     if strict:
         all_recs = [r for r in all_recs if r.score >= 2.0]
 
-    # Dedupe
-    all_recs = deduplicate(all_recs)
-
     # Order
     all_recs.sort(key=lambda r: (-(r.score or 0), -(r.year or 0), r.title.lower()))
 
     # Write JSONL
     os.makedirs(os.path.dirname(out_jsonl) or ".", exist_ok=True)
-    with open(out_jsonl, "w", encoding="utf-8") as f:
+    with open(out_jsonl, "wb", buffering=1 << 20) as f:
         for r in all_recs:
-            f.write(json.dumps(r.to_dict(), ensure_ascii=False) + "\n")
-    print(f"[ok] Wrote {len(all_recs)} records to {out_jsonl}")
+            if orjson is not None:
+                f.write(orjson.dumps(r.to_dict(), option=orjson.OPT_APPEND_NEWLINE))
+            else:
+                f.write((json.dumps(r.to_dict(), ensure_ascii=False) + "\n").encode("utf-8"))
+    log.info("[ok] Wrote %d records to %s", len(all_recs), out_jsonl)
 
     # Write CSV
     if out_csv:
         os.makedirs(os.path.dirname(out_csv) or ".", exist_ok=True)
-        fields = [
-            "title",
-            "abstract",
-            "year",
-            "doi",
-            "url",
-            "pdf_url",
-            "venue",
-            "authors",
-            "source",
-            "_score",
-        ]
-        with open(out_csv, "w", newline="", encoding="utf-8") as f:
-            w = csv.DictWriter(f, fieldnames=fields)
-            w.writeheader()
-            for r in all_recs:
-                row = r.to_dict()
-                row["authors"] = "; ".join(row.get("authors") or [])
-                w.writerow(row)
-        print(f"[ok] Wrote CSV to {out_csv}")
+        with open(out_csv, "w", newline="", encoding="utf-8", buffering=1 << 20) as f:
+            w = csv.writer(f)
+            w.writerow(CSV_FIELDS)
+            w.writerows(r.csv_row() for r in all_recs)
+        log.info("[ok] Wrote CSV to %s", out_csv)
 
 
 # --------------------------- CLI ---------------------------
@@ -1103,24 +1464,37 @@ def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
         action="store_true",
         help="Do not strictly validate candidate PDF links (HEAD/GET sniff) during scraping pass",
     )
+    ap.add_argument("-v", "--verbose", action="store_true", help="Also log every PDF link found while scraping")
+    ap.add_argument("-q", "--quiet", action="store_true", help="Only log warnings (no progress lines)")
     return ap.parse_args(argv)
 
 
-def main(argv: Optional[List[str]] = None) -> None:
+def main(
+    argv: Optional[List[str]] = None,
+    *,
+    cancel: Optional[threading.Event] = None,
+    stream=None,
+) -> None:
     args = parse_args(argv)
-    if args.from_year > args.to_year:
-        print("[error] --from-year must be <= --to-year", file=sys.stderr)
-        sys.exit(2)
-    run(
-        query=args.query,
-        y0=args.from_year,
-        y1=args.to_year,
-        max_per_source=args.max_per_source,
-        strict=args.strict,
-        out_jsonl=args.out,
-        out_csv=args.csv,
-        validate_pdf_links=(not args.no_validate),
-    )
+    level = logging.WARNING if args.quiet else logging.DEBUG if args.verbose else logging.INFO
+    handler = setup_logging(level, stream)
+    try:
+        if args.from_year > args.to_year:
+            log.error("[error] --from-year must be <= --to-year")
+            sys.exit(2)
+        run(
+            query=args.query,
+            y0=args.from_year,
+            y1=args.to_year,
+            max_per_source=args.max_per_source,
+            strict=args.strict,
+            out_jsonl=args.out,
+            out_csv=args.csv,
+            validate_pdf_links=(not args.no_validate),
+            cancel=cancel,
+        )
+    finally:
+        log.removeHandler(handler)
 
 
 if __name__ == "__main__":